@@ -1,4 +1,4 @@
-from .tello import Tello, TelloException
+from .tello import Tello, TelloException, TelloCommandError
 from .swarm import TelloSwarm
 from .stream import TelloSwarmStream, TelloStream, BackgroundFrameRead
 from .communication import TelloCommunication
@@ -1,41 +1,177 @@
+import ipaddress
+import os
+import selectors
 import socket
-from threading import Thread
+import sys
+from collections import deque
+from threading import Thread, Lock, Event
+from typing import Dict, List, Optional, Tuple, Union
 from .logger import TelloLogger
+from . import mmsg
 
 
 class TelloCommunication:
     """Handles communication with the Tello drone."""
 
+    __slots__ = (
+        'forward_video_stream', 'cpu_affinity',
+        'udp_control_handlers', 'udp_state_handlers', '_control_handler', '_state_handler',
+        'control_socket', 'state_socket',
+        'video_stream_socket', 'video_stream_multicast_destination', '_multicast_sockets',
+        '_lock', '_selector', '_video_selectors', '_wakeup_sockets', '_threads',
+        '_state_queue', '_state_event',
+    )
+
     CONTROL_UDP_PORT = 8889
     STATE_UDP_PORT = 8890
-
-    def __init__(self, forward_video_stream: bool = False) -> None:
-        """Initialize the TelloCommunication object."""
+    VIDEO_RECV_BATCH_SIZE = 32  # max. datagrams read per recvmmsg call
+    # Upper bound for draining a video socket in one wakeup, so one busy stream can't
+    # starve the other sockets served by the same event loop
+    VIDEO_MAX_DATAGRAMS_PER_WAKEUP = 256
+
+    # Kernel buffer sizes of the video forwarding sockets. A 720p stream bursts more
+    # than the default ~200KB, Linux caps the values at net.core.rmem_max / wmem_max
+    VIDEO_RECV_BUFFER_SIZE = 4 * 1024 * 1024  # in bytes
+    VIDEO_SEND_BUFFER_SIZE = 4 * 1024 * 1024  # in bytes
+    VIDEO_MULTICAST_TTL = 2
+
+    # Kernel buffer sizes of the control and state sockets, shared by all drones of a swarm
+    CONTROL_RECV_BUFFER_SIZE = 1024 * 1024  # in bytes
+    CONTROL_SEND_BUFFER_SIZE = 1024 * 1024  # in bytes
+
+    # State packets waiting to be parsed. If the parser falls behind the oldest ones are
+    # dropped, they are outdated by the newer packets anyway
+    STATE_QUEUE_SIZE = 64
+
+    # set once the cap of a default buffer size was logged, see _set_buffer_size
+    _default_buffer_cap_logged = False
+
+    def __init__(self, forward_video_stream: bool = False, video_workers: int = 0, cpu_affinity: Optional[Dict[str, int]] = None,
+                 recv_buffer_size: Optional[int] = None, send_buffer_size: Optional[int] = None) -> None:
+        """Initialize the TelloCommunication object.
+
+        Arguments:
+            forward_video_stream: forward the video streams received on the added ports
+            video_workers: number of extra threads that forward video streams. Each
+                port is assigned to one of them, so multiple drones' streams are
+                forwarded in parallel. 0 forwards on the main event loop thread.
+            cpu_affinity: pin threads to a CPU core, e.g. the one serving the NIC
+                interrupts (see /proc/irq/<irq>/smp_affinity_list). Maps the thread
+                name, 'main', 'state' or 'video-<i>', to the core number. Linux only.
+            recv_buffer_size: kernel receive buffer of the control and state sockets in bytes,
+                CONTROL_RECV_BUFFER_SIZE if None. The state packets of all drones arrive on the
+                same socket, the kernel default (~200KB on Linux) drops packets for larger swarms.
+                Linux caps the size at net.core.rmem_max, a warning is logged if a size given
+                here is capped.
+            send_buffer_size: kernel send buffer of the control and state sockets in bytes,
+                CONTROL_SEND_BUFFER_SIZE if None
+        """
 
         self.forward_video_stream = forward_video_stream
+        self.cpu_affinity = cpu_affinity or {}
         self.udp_control_handlers = {}
         self.udp_state_handlers = {}
+        # bound once, looked up for every received packet
+        self._control_handler = self.udp_control_handlers.get
+        self._state_handler = self.udp_state_handlers.get
         self.control_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.state_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.video_stream_socket = {}
+        # port -> tuple of (ip, port) destinations. The tuples are replaced, never mutated,
+        # so the forwarder can iterate them without holding the lock
         self.video_stream_multicast_destination = {}
+        # if_ip -> outbound socket shared by all ports forwarding to two or more destinations
+        self._multicast_sockets = {}
+        # Serializes all changes to the handler, socket and destination tables. The event
+        # loop threads never take it: they only load dict entries and immutable tuples,
+        # which stays safe on free-threaded (no GIL) Python builds as well
+        self._lock = Lock()
+        buffer_sizes = [
+            (socket.SO_RCVBUF, TelloCommunication.CONTROL_RECV_BUFFER_SIZE if recv_buffer_size is None else recv_buffer_size, recv_buffer_size is not None),
+            (socket.SO_SNDBUF, TelloCommunication.CONTROL_SEND_BUFFER_SIZE if send_buffer_size is None else send_buffer_size, send_buffer_size is not None),
+        ]
+        for sock in (self.control_socket, self.state_socket):
+            for option, size, requested in buffer_sizes:
+                TelloCommunication._set_buffer_size(sock, option, size, requested)
         self.control_socket.bind(('', TelloCommunication.CONTROL_UDP_PORT))
         self.state_socket.bind(('', TelloCommunication.STATE_UDP_PORT))
 
-    def send_command(self, command: str, address) -> None:
-        """Send a command to the Tello."""
+        # All receiving sockets are multiplexed on a single selector (epoll on Linux)
+        # which is served by one thread, see _event_loop
+        self._selector = selectors.DefaultSelector()
+        self.control_socket.setblocking(False)
+        self.state_socket.setblocking(False)
+        self._selector.register(self.control_socket, selectors.EVENT_READ, data=("control", TelloCommunication.CONTROL_UDP_PORT))
+        self._selector.register(self.state_socket, selectors.EVENT_READ, data=("state", TelloCommunication.STATE_UDP_PORT))
+        self._video_selectors = [selectors.DefaultSelector() for _ in range(video_workers)]
+
+        # stop() wakes every event loop through a socket pair registered on its selector
+        self._wakeup_sockets = []
+        for selector in [self._selector] + self._video_selectors:
+            wakeup_receiver, wakeup_sender = socket.socketpair()
+            wakeup_receiver.setblocking(False)
+            selector.register(wakeup_receiver, selectors.EVENT_READ, data=("stop", None))
+            self._wakeup_sockets += [wakeup_receiver, wakeup_sender]
+        self._threads = []
+
+        # The event loop only queues the received state packets, they are parsed and passed
+        # to the state handlers on a separate thread (see _state_worker). Receiving is never
+        # held up by parsing, which drops fewer packets when many drones send at once
+        self._state_queue = deque(maxlen=TelloCommunication.STATE_QUEUE_SIZE)
+        self._state_event = Event()
+
+    @staticmethod
+    def _set_buffer_size(sock: socket.socket, option: int, size: int, requested: bool = False) -> None:
+        """Set SO_RCVBUF or SO_SNDBUF of a socket. If the kernel caps the size, warn about a size
+        the user requested. The default sizes are above stock Linux limits, their cap is only
+        logged once, at info level.
+        """
+
+        sock.setsockopt(socket.SOL_SOCKET, option, size)
+        # Linux reports twice the set size (it includes its bookkeeping overhead), a smaller
+        # value means the request was capped at net.core.rmem_max / wmem_max
+        if sock.getsockopt(socket.SOL_SOCKET, option) < size:
+            name, limit = ('SO_RCVBUF', 'rmem_max') if option == socket.SO_RCVBUF else ('SO_SNDBUF', 'wmem_max')
+            message = "{} of {} bytes was capped by the kernel, consider raising net.core.{}".format(name, size, limit)
+            if requested:
+                TelloLogger.warning(message)
+            elif not TelloCommunication._default_buffer_cap_logged:
+                TelloCommunication._default_buffer_cap_logged = True
+                TelloLogger.info(message)
+
+    def send_command(self, command: Union[str, bytes], address) -> None:
+        """Send a command to the Tello. Commands built as bytes are sent as they are."""
+
+        if isinstance(command, str):
+            command = command.encode('utf-8')
+        self.control_socket.sendto(command, address)
+
+    def send_command_batch(self, commands: List[Tuple[Union[str, bytes], Tuple[str, int]]]) -> None:
+        """Send (command, address) pairs, e.g. one command to each drone of a swarm.
+        On Linux all of them are sent with a single sendmmsg call.
+        """
+
+        datagrams = [(command.encode('utf-8') if isinstance(command, str) else command, address)
+                     for command, address in commands]
+        if mmsg.AVAILABLE:
+            mmsg.send(self.control_socket, datagrams)
+            return
 
-        self.control_socket.sendto(command.encode('utf-8'), address)
+        sendto = self.control_socket.sendto
+        for data, address in datagrams:
+            sendto(data, address)
 
     def add_udp_control_handler(self, ip: str, fn) -> None:
         """Add a handler for UDP control data."""
 
-        self.udp_control_handlers[ip] = fn
+        with self._lock:
+            self.udp_control_handlers[ip] = fn
 
     def add_udp_state_handler(self, ip: str, fn) -> None:
         """Add a handler for UDP state data."""
 
-        self.udp_state_handlers[ip] = fn
+        with self._lock:
+            self.udp_state_handlers[ip] = fn
 
     def add_udp_video_stream_handler(self, if_ip: str, port: int) -> None:
 
@@ -44,30 +180,120 @@ class TelloCommunication:
             return
 
         current_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        TelloCommunication._set_buffer_size(current_socket, socket.SO_RCVBUF, TelloCommunication.VIDEO_RECV_BUFFER_SIZE)
         current_socket.bind(('', port))
+        current_socket.setblocking(False)
+
+        batch = mmsg.RecvBatch(TelloCommunication.VIDEO_RECV_BATCH_SIZE) if mmsg.AVAILABLE else None
+
+        entry = {
+            "socket": current_socket,
+            # Outbound sockets are only opened once destinations are added, see _update_forward_sockets.
+            # multicast_socket (shared per interface) serves two or more destinations, connected_socket a single one
+            "multicast_socket": None,
+            "connected_socket": None,
+            # sendmmsg messages for all destinations of the port, see _update_forward_sockets
+            "send_batch": None,
+            "if_ip": if_ip,
+            "batch": batch,
+            "buffer": memoryview(bytearray(2048)) if batch is None else None
+        }
+
+        with self._lock:
+            self.video_stream_socket[port] = entry
+            self._update_forward_sockets(port)
 
-        forward_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            # Ports are distributed round-robin over the video workers, each port (and
+            # its receive buffers) is only ever touched by a single thread
+            if self._video_selectors:
+                selector = self._video_selectors[(len(self.video_stream_socket) - 1) % len(self._video_selectors)]
+            else:
+                selector = self._selector
+            selector.register(current_socket, selectors.EVENT_READ, data=("video", port))
+
+    def _create_multicast_socket(self, if_ip: str) -> socket.socket:
+        """Create a socket to send video datagrams to multicast groups, broadcast addresses or hosts via the interface if_ip."""
 
         multicast_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
-        multicast_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
+        TelloCommunication._set_buffer_size(multicast_socket, socket.SO_SNDBUF, TelloCommunication.VIDEO_SEND_BUFFER_SIZE)
+        # allow (subnet directed) broadcast destinations, otherwise sending to them fails with EACCES
+        multicast_socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        multicast_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, TelloCommunication.VIDEO_MULTICAST_TTL)
         multicast_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(if_ip))
+        # Never set DF on forwarded datagrams, so ICMP "fragmentation needed" can't stall them.
+        # Linux only, older Python versions don't export the constants (10 and 0 on Linux)
+        if sys.platform.startswith('linux'):
+            multicast_socket.setsockopt(socket.IPPROTO_IP, getattr(socket, 'IP_MTU_DISCOVER', 10), getattr(socket, 'IP_PMTUDISC_DONT', 0))
+
+        return multicast_socket
+
+    def _update_forward_sockets(self, local_port: int) -> None:
+        """Open or close the outbound sockets of a port to match its destinations.
+        A single destination gets a connected socket, so the kernel does not have to
+        look up the destination for every datagram. Ports with two or more destinations
+        share one unconnected socket per interface.
+        Must be called with self._lock held.
+        """
+
+        if local_port not in self.video_stream_socket:
+            return
 
-        self.video_stream_socket[port] = {
-            "socket": current_socket,
-            "forward_socket": forward_socket,
-            "multicast_socket": multicast_socket
-        }
+        entry = self.video_stream_socket[local_port]
+        if_ip = entry["if_ip"]
+        destinations = self.video_stream_multicast_destination.get(local_port, ())
+        connected_socket = entry["connected_socket"]
+
+        if len(destinations) == 1:
+            entry["connected_socket"] = self._create_multicast_socket(if_ip)
+            entry["connected_socket"].connect(destinations[0])
+        else:
+            entry["connected_socket"] = None
+
+        if len(destinations) > 1:
+            if if_ip not in self._multicast_sockets:
+                self._multicast_sockets[if_ip] = self._create_multicast_socket(if_ip)
+            entry["multicast_socket"] = self._multicast_sockets[if_ip]
+            # replaced as a whole, the event loop may still be sending with the previous one
+            entry["send_batch"] = mmsg.SendBatch(destinations, TelloCommunication.VIDEO_RECV_BATCH_SIZE) if mmsg.AVAILABLE else None
+        else:
+            entry["multicast_socket"] = None
+            entry["send_batch"] = None
+
+        if connected_socket is not None:
+            connected_socket.close()
+
+        # close the shared socket of the interface once no port sends on it anymore
+        multicast_socket = self._multicast_sockets.get(if_ip)
+        if multicast_socket is not None and not any(e["multicast_socket"] is multicast_socket for e in self.video_stream_socket.values()):
+            del self._multicast_sockets[if_ip]
+            multicast_socket.close()
 
     def add_video_stream_multicast_destination(self, local_port: int, destination_multicast_ip: str, destination_multicast_port: int) -> None:
+        """Forward the video stream received on local_port to a multicast group.
+        A single group is enough for any number of receivers: each of them joins
+        the group (IP_ADD_MEMBERSHIP, e.g. TelloStream does so via FFmpeg) and the
+        kernel fans out one send to all members. Without multicast support in the
+        network, a broadcast address (e.g. 192.168.10.255) reaches every host of the
+        subnet with one send as well. Unicast destinations also work, but every one
+        of them costs an extra send per packet.
+        """
 
         if not self.forward_video_stream:
             TelloLogger.warning("Video stream forwarding is disabled. Please enable it by setting forward_video_stream to True.")
             return
 
-        if local_port not in self.video_stream_multicast_destination:
-            self.video_stream_multicast_destination[local_port] = []
-        
-        self.video_stream_multicast_destination[local_port].append((destination_multicast_ip, destination_multicast_port))
+        destination = (destination_multicast_ip, destination_multicast_port)
+
+        with self._lock:
+            destinations = self.video_stream_multicast_destination.get(local_port, ())
+            if destination in destinations:
+                return
+
+            if any(ipaddress.ip_address(ip).is_multicast for ip, _ in destinations) and ipaddress.ip_address(destination_multicast_ip).is_multicast:
+                TelloLogger.warning("Port {} already forwards to a multicast group. Let all receivers join that group instead of adding another one.".format(local_port))
+
+            self.video_stream_multicast_destination[local_port] = destinations + (destination,)
+            self._update_forward_sockets(local_port)
 
     def remove_video_stream_multicast_destination(self, local_port: int, destination_multicast_ip: str, destination_multicast_port: int) -> None:
 
@@ -75,61 +301,199 @@ class TelloCommunication:
             TelloLogger.warning("Video stream forwarding is disabled. Please enable it by setting forward_video_stream to True.")
             return
         
-        if local_port not in self.video_stream_multicast_destination:
-            return
+        with self._lock:
+            if local_port not in self.video_stream_multicast_destination:
+                return
 
-        self.video_stream_multicast_destination[local_port].remove((destination_multicast_ip, destination_multicast_port))
+            destinations = list(self.video_stream_multicast_destination[local_port])
+            destinations.remove((destination_multicast_ip, destination_multicast_port))
+            self.video_stream_multicast_destination[local_port] = tuple(destinations)
+            self._update_forward_sockets(local_port)
 
     def start(self) -> None:
-        """Start the communication thread."""
+        """Start the communication threads."""
+
+        event_loops = [("main", self._selector)]
+        event_loops += [("video-{}".format(i), selector) for i, selector in enumerate(self._video_selectors)]
+
+        for name, selector in event_loops:
+            event_loop_thread = Thread(target=self._event_loop, args=(selector, name), name="tello-communication-{}".format(name))
+            event_loop_thread.daemon = True
+            event_loop_thread.start()
+            self._threads.append(event_loop_thread)
+
+        state_thread = Thread(target=self._state_worker, name="tello-communication-state")
+        state_thread.daemon = True
+        state_thread.start()
+        self._threads.append(state_thread)
+
+    def stop(self, timeout: float = None) -> None:
+        """Stop the communication threads and close all sockets.
+        The object can't be used anymore afterwards.
+        """
+
+        # every second wakeup socket is the sending end of a pair
+        for wakeup_sender in self._wakeup_sockets[1::2]:
+            wakeup_sender.send(b'\0')
+        self._state_queue.append(None)
+        self._state_event.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+        with self._lock:
+            sockets = [self.control_socket, self.state_socket] + self._wakeup_sockets
+            sockets += list(self._multicast_sockets.values())
+            for entry in self.video_stream_socket.values():
+                sockets += [entry["socket"], entry["connected_socket"]]
+            self._multicast_sockets.clear()
+
+            for sock in sockets:
+                if sock is not None:
+                    sock.close()
+            for selector in [self._selector] + self._video_selectors:
+                selector.close()
+
+    def _set_thread_affinity(self, name: str) -> None:
+        """Pin the calling thread to the CPU core configured for it in cpu_affinity, if any."""
+
+        if name in self.cpu_affinity:
+            try:
+                # pid 0 is the calling thread
+                os.sched_setaffinity(0, {self.cpu_affinity[name]})
+            except (AttributeError, OSError) as e:
+                TelloLogger.warning("Could not pin thread '{}' to CPU {}: {}".format(name, self.cpu_affinity[name], e))
 
-        udp_control_thread = Thread(target=self._receive_control_data)
-        udp_control_thread.daemon = True
-        udp_state_thread = Thread(target=self._receive_state_data)
-        udp_state_thread.daemon = True
+    def _event_loop(self, selector: selectors.BaseSelector, name: str) -> None:
+        """Wait for incoming data on the sockets of a selector and dispatch it to the matching receiver."""
 
-        if self.forward_video_stream is True:
-            for port in self.video_stream_socket:
-                current_thread = Thread(target=self._receive_video_stream_data, args=(port,))
-                current_thread.daemon = True
-                current_thread.start()
+        self._set_thread_affinity(name)
+        log_error = TelloLogger.error
 
-        udp_control_thread.start()
-        udp_state_thread.start()
+        # The handler is set up once around the loop instead of once per event. After an
+        # error the loop is simply re-entered: the selector is level-triggered, so events
+        # not handled in the aborted round are reported again by the next select call.
+        while True:
+            try:
+                while True:
+                    for key, _ in selector.select(timeout=None):
+                        kind, port = key.data
+                        if kind == "control":
+                            self._receive_control_data()
+                        elif kind == "state":
+                            self._receive_state_data()
+                        elif kind == "stop":
+                            return
+                        else:
+                            self._receive_video_stream_data(port)
+            except BlockingIOError:
+                pass
+            except Exception as e:
+                # socket errors as well as errors raised by a handler, neither may stop the thread
+                log_error(e)
 
     def _receive_control_data(self) -> None:
         """Receive control data from the Tello."""
 
-        while True:
-            try:
-                data, address = self.control_socket.recvfrom(1024)
-                if address[0] in self.udp_control_handlers:
-                    self.udp_control_handlers[address[0]](data, address)
-            except Exception as e:
-                TelloLogger.error(e)
+        data, address = self.control_socket.recvfrom(2048)
+        handler = self._control_handler(address[0])
+        if handler is not None:
+            handler(data, address)
 
     def _receive_state_data(self) -> None:
-        """Receive state data from the Tello."""
+        """Receive state data from the Tello and queue it for the state worker."""
 
-        while True:
-            try:
-                data, address = self.state_socket.recvfrom(1024)
-                if address[0] in self.udp_state_handlers:
-                    self.udp_state_handlers[address[0]](data, address)
-            except Exception as e:
-                TelloLogger.error(e)
+        self._state_queue.append(self.state_socket.recvfrom(2048))
+        self._state_event.set()
 
-    def _receive_video_stream_data(self, port: int) -> None:
-        """Receive video stream data from the Tello."""
+    def _state_worker(self) -> None:
+        """Pass the queued state packets to the matching receivers, until stop() queues None."""
+
+        self._set_thread_affinity("state")
+        queue = self._state_queue
+        event = self._state_event
+        handler_for = self._state_handler
 
         while True:
+            event.wait()
+            # cleared before draining, a packet queued meanwhile sets it again
+            event.clear()
+            while queue:
+                item = queue.popleft()
+                if item is None:
+                    return
+
+                data, address = item
+                handler = handler_for(address[0])
+                if handler is None:
+                    continue
+                try:
+                    handler(data, address)
+                except Exception as e:
+                    # a failing handler may not stop the thread
+                    TelloLogger.error(e)
+
+    def _receive_video_stream_data(self, port: int) -> None:
+        """Receive video stream data from the Tello.
+        Drains the socket, so a burst of datagrams costs a single wakeup.
+        """
+
+        entry = self.video_stream_socket[port]
+        current_socket = entry["socket"]
+        batch = entry["batch"]
+        buffer = entry["buffer"]
+        forward = self._forward_video_stream_data
+        max_datagrams = TelloCommunication.VIDEO_MAX_DATAGRAMS_PER_WAKEUP
+
+        received = 0
+        while received < max_datagrams:
+            # On Linux all queued datagrams are read with one recvmmsg call,
+            # elsewhere fall back to one recvfrom_into per datagram. Both read into
+            # preallocated buffers, forwarding sends memoryviews of these.
             try:
-                current_socket = self.video_stream_socket[port]["socket"]
-                data, _ = current_socket.recvfrom(2048)
+                if batch is not None:
+                    packets = batch.recv(current_socket)
+                else:
+                    n, _ = current_socket.recvfrom_into(buffer)
+                    packets = (buffer[:n],)
+            except BlockingIOError:
+                return
+
+            forward(entry, port, packets)
+            received += len(packets)
+
+            # a partial batch means the socket queue is empty, skip the recvmmsg that would fail
+            if batch is not None and len(packets) < batch.batch_size:
+                return
+
+    def _forward_video_stream_data(self, entry: dict, port: int, packets) -> None:
+        """Send received video datagrams to the destinations of a port."""
+
+        connected_socket = entry["connected_socket"]
+        if connected_socket is not None:
+            send = connected_socket.send
+            for data in packets:
+                try:
+                    send(data)
+                except ConnectionRefusedError:
+                    # ICMP port unreachable from an earlier datagram, only connected sockets report
+                    # these. Nobody is listening yet, drop the datagram like sendto would
+                    pass
+            return
 
-                if port in self.video_stream_multicast_destination and self.video_stream_multicast_destination[port] is not None:
-                    multicast_socket = self.video_stream_socket[port]["multicast_socket"]
-                    for dest_ip, dest_port in self.video_stream_multicast_destination[port]:
-                        multicast_socket.sendto(data, (dest_ip, dest_port))
-            except Exception as e:
-                TelloLogger.error(e)
+        multicast_socket = entry["multicast_socket"]
+        if multicast_socket is None:
+            return
+
+        # On Linux all packets are sent to all destinations with one sendmmsg call
+        send_batch = entry["send_batch"]
+        if send_batch is not None:
+            send_batch.send(multicast_socket, packets)
+            return
+
+        destinations = self.video_stream_multicast_destination.get(port)
+        if destinations:
+            sendto = multicast_socket.sendto
+            for data in packets:
+                for destination in destinations:
+                    sendto(data, destination)
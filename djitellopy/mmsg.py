@@ -0,0 +1,194 @@
+"""Batched UDP receive and send using the Linux recvmmsg(2) and sendmmsg(2) system calls.
+Internal module, only available on Linux. Check `mmsg.AVAILABLE` before use.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import socket
+import sys
+from typing import List, Sequence, Tuple
+
+MSG_DONTWAIT = 0x40
+
+
+class _IOVec(ctypes.Structure):
+    _fields_ = [
+        ('iov_base', ctypes.c_void_p),
+        ('iov_len', ctypes.c_size_t),
+    ]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ('msg_name', ctypes.c_void_p),
+        ('msg_namelen', ctypes.c_uint32),
+        ('msg_iov', ctypes.POINTER(_IOVec)),
+        ('msg_iovlen', ctypes.c_size_t),
+        ('msg_control', ctypes.c_void_p),
+        ('msg_controllen', ctypes.c_size_t),
+        ('msg_flags', ctypes.c_int),
+    ]
+
+
+class _SockAddrIn(ctypes.Structure):
+    _fields_ = [
+        ('sin_family', ctypes.c_ushort),
+        ('sin_port', ctypes.c_uint16),  # network byte order
+        ('sin_addr', ctypes.c_ubyte * 4),
+        ('sin_zero', ctypes.c_ubyte * 8),
+    ]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [
+        ('msg_hdr', _MsgHdr),
+        ('msg_len', ctypes.c_uint),
+    ]
+
+
+def _load_libc():
+    if not sys.platform.startswith('linux'):
+        return None
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        recvmmsg = libc.recvmmsg
+        sendmmsg = libc.sendmmsg
+    except (OSError, AttributeError):
+        return None
+
+    recvmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+    recvmmsg.restype = ctypes.c_int
+    sendmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int]
+    sendmmsg.restype = ctypes.c_int
+    return libc
+
+
+_libc = _load_libc()
+AVAILABLE = _libc is not None
+
+
+def _set_sockaddr(address: _SockAddrIn, ip: str, port: int) -> None:
+    address.sin_family = socket.AF_INET
+    address.sin_port = socket.htons(port)
+    address.sin_addr[:] = socket.inet_aton(socket.gethostbyname(ip))
+
+
+def _sendmmsg(sock: socket.socket, msgs, total: int) -> None:
+    """Send the first `total` messages of the mmsghdr array `msgs`."""
+
+    fd = sock.fileno()
+    base = ctypes.addressof(msgs)
+    sent = 0
+    # sendmmsg may send fewer messages than requested, continue after the last sent one
+    while sent < total:
+        count = _libc.sendmmsg(fd, base + sent * ctypes.sizeof(_MMsgHdr), total - sent, 0)
+        if count < 0:
+            err = ctypes.get_errno()
+            if err == errno.EINTR:
+                continue
+            raise OSError(err, os.strerror(err))
+        sent += count
+
+
+def send(sock: socket.socket, datagrams: Sequence[Tuple[bytes, Tuple[str, int]]]) -> None:
+    """Send each (data, (ip, port)) datagram to its own address with a single sendmmsg call.
+    Raises OSError if a datagram could not be sent.
+    """
+
+    count = len(datagrams)
+    addresses = (_SockAddrIn * count)()
+    iovecs = (_IOVec * count)()
+    msgs = (_MMsgHdr * count)()
+    # referenced until the call returns, the iovecs point into them
+    c_buffers = [ctypes.create_string_buffer(data, len(data)) for data, _ in datagrams]
+    for i, (c_buffer, (_, (ip, port))) in enumerate(zip(c_buffers, datagrams)):
+        _set_sockaddr(addresses[i], ip, port)
+        iovecs[i].iov_base = ctypes.addressof(c_buffer)
+        iovecs[i].iov_len = len(c_buffer)
+        msgs[i].msg_hdr.msg_name = ctypes.addressof(addresses[i])
+        msgs[i].msg_hdr.msg_namelen = ctypes.sizeof(_SockAddrIn)
+        msgs[i].msg_hdr.msg_iov = ctypes.pointer(iovecs[i])
+        msgs[i].msg_hdr.msg_iovlen = 1
+
+    _sendmmsg(sock, msgs, count)
+
+
+class RecvBatch:
+    """Preallocated buffers to receive up to `batch_size` datagrams with a single
+    recvmmsg call. The datagrams are exposed as memoryviews into the buffers and
+    are only valid until the next call to `recv`.
+    """
+
+    def __init__(self, batch_size: int = 32, buffer_size: int = 2048) -> None:
+        self.batch_size = batch_size
+        self.buffers = [bytearray(buffer_size) for _ in range(batch_size)]
+        self.views = [memoryview(buffer) for buffer in self.buffers]
+
+        # keep the ctypes views alive, they pin the bytearrays while they are referenced by the iovecs
+        self._c_buffers = [(ctypes.c_char * buffer_size).from_buffer(buffer) for buffer in self.buffers]
+        self._iovecs = (_IOVec * batch_size)()
+        self._msgs = (_MMsgHdr * batch_size)()
+        for i, c_buffer in enumerate(self._c_buffers):
+            self._iovecs[i].iov_base = ctypes.addressof(c_buffer)
+            self._iovecs[i].iov_len = buffer_size
+            self._msgs[i].msg_hdr.msg_iov = ctypes.pointer(self._iovecs[i])
+            self._msgs[i].msg_hdr.msg_iovlen = 1
+
+    def recv(self, sock: socket.socket) -> List[memoryview]:
+        """Receive all queued datagrams up to the batch size without blocking.
+        Raises BlockingIOError if no datagram is available.
+        """
+        count = _libc.recvmmsg(sock.fileno(), self._msgs, self.batch_size, MSG_DONTWAIT, None)
+        if count < 0:
+            err = ctypes.get_errno()
+            if err in (errno.EAGAIN, errno.EWOULDBLOCK):
+                raise BlockingIOError(err, os.strerror(err))
+            raise OSError(err, os.strerror(err))
+
+        msgs = self._msgs
+        views = self.views
+        return [views[i][:msgs[i].msg_len] for i in range(count)]
+
+
+class SendBatch:
+    """Preallocated messages to send up to `batch_size` datagrams to each of the
+    `destinations` with a single sendmmsg call. The destination addresses are encoded
+    once, the messages of a datagram share one iovec pointing to its data.
+    """
+
+    def __init__(self, destinations: Sequence[Tuple[str, int]], batch_size: int = 32) -> None:
+        self.batch_size = batch_size
+        self.destinations = tuple(destinations)
+        count = len(self.destinations)
+
+        self._addresses = (_SockAddrIn * count)()
+        for address, (ip, port) in zip(self._addresses, self.destinations):
+            _set_sockaddr(address, ip, port)
+
+        self._iovecs = (_IOVec * batch_size)()
+        self._msgs = (_MMsgHdr * (batch_size * count))()
+        for i in range(batch_size):
+            for j in range(count):
+                msg_hdr = self._msgs[i * count + j].msg_hdr
+                msg_hdr.msg_name = ctypes.addressof(self._addresses[j])
+                msg_hdr.msg_namelen = ctypes.sizeof(_SockAddrIn)
+                msg_hdr.msg_iov = ctypes.pointer(self._iovecs[i])
+                msg_hdr.msg_iovlen = 1
+
+    def send(self, sock: socket.socket, packets: Sequence[memoryview]) -> None:
+        """Send every packet to every destination. The packets must be writable
+        memoryviews, e.g. the ones returned by `RecvBatch.recv`.
+        Raises OSError if a datagram could not be sent.
+        """
+
+        # the ctypes views pin the packet buffers until the call returns
+        c_buffers = [(ctypes.c_char * len(packet)).from_buffer(packet) for packet in packets]
+        iovecs = self._iovecs
+        for i, c_buffer in enumerate(c_buffers):
+            iovecs[i].iov_base = ctypes.addressof(c_buffer)
+            iovecs[i].iov_len = len(c_buffer)
+
+        _sendmmsg(sock, self._msgs, len(c_buffers) * len(self.destinations))
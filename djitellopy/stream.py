@@ -1,11 +1,22 @@
 import av
+from av.video.reformatter import VideoReformatter
 import numpy as np
 import json
 from collections import deque
-from threading import Thread, Lock
-from typing import List, Union
+from threading import Thread, Event
+from typing import List, Tuple, Union
 from .logger import TelloLogger
 
+try:
+    import orjson  # optional, faster json parser
+except ImportError:
+    orjson = None
+
+try:
+    import cv2  # for opencv_conversion
+except ImportError:
+    cv2 = None
+
 class TelloException(Exception):
     pass
 
@@ -14,13 +25,45 @@ class BackgroundFrameRead:
     """
     This class read frames using PyAV in background. Use
     backgroundFrameRead.frame to get the current frame.
+
+    Pass a PyAV `av.codec.hwaccel.HWAccel` as `hwaccel` to decode on the GPU, e.g.
+    `HWAccel(device_type='cuda', allow_software_fallback=True)` ('videotoolbox' on macOS,
+    'd3d11va' on Windows). Requires PyAV 14 or newer.
+
+    Frames are numpy arrays in the pixel format `output_format`, e.g. 'bgr24' for
+    OpenCV. With `output_format=None` the decoded `av.VideoFrame`s are passed on without
+    any conversion, e.g. to hand their planes to PyTorch or CuPy via DLPack. Call
+    `frame.to_ndarray()` on them to get a numpy array on demand.
+
+    `output_size=(width, height)` scales the frames in the same pass as the pixel format
+    conversion, which is cheaper than resizing the converted frame again.
+
+    `decoder_threads` lets FFmpeg decode on multiple threads. Frame threading delays
+    every frame by about one frame per thread, so this trades latency for throughput.
+    When decoding many streams, split the cores among them instead of giving all to each.
+
+    With `opencv_conversion=True`, 'rgb24' and 'bgr24' frames are converted by OpenCV
+    instead of swscale if there is nothing to scale, which is faster. OpenCV always uses
+    the BT.601 limited range matrix and upsamples the chroma planes without filtering,
+    so the colors can differ slightly from the swscale conversion.
     """
 
-    def __init__(self, address, with_queue = False, maxsize = 32) -> None:
+    # consecutive undecodable packets after which the stream is given up
+    MAX_DECODE_FAILURES = 30
+
+    def __init__(self, address, with_queue = False, maxsize = 32, hwaccel = None, output_format = 'rgb24',
+                 output_size: Union[Tuple[int, int], None] = None, decoder_threads: Union[int, None] = None,
+                 opencv_conversion: bool = False) -> None:
+        if opencv_conversion and cv2 is None:
+            raise TelloException('opencv_conversion needs OpenCV (cv2) to be installed')
         self.address = address
-        self.lock = Lock()
-        self.frame = np.zeros([300, 400, 3], dtype=np.uint8)
-        self.frames = deque([], maxsize)
+        self.opencv_conversion = opencv_conversion
+        self.output_format = output_format
+        self.output_size = output_size
+        width, height = output_size or (400, 300)
+        self.frame = np.zeros([height, width, 3], dtype=np.uint8)
+        # Live video prefers fresh frames: when the queue is full, appending drops the oldest one
+        self.frames = deque([], maxlen=maxsize)
         self.with_queue = with_queue
 
         # Try grabbing frame with PyAV
@@ -28,11 +71,20 @@ class BackgroundFrameRead:
         # https://github.com/damiafuentes/DJITelloPy/issues/90#issuecomment-855458905
         try:
             TelloLogger.debug('trying to grab video frames...')
-            self.container = av.open(self.address, timeout=(TelloStream.FRAME_GRAB_TIMEOUT, None))
+            options = {}
+            if hwaccel is not None:
+                # only passed when set, older PyAV versions don't know the argument
+                options['hwaccel'] = hwaccel
+            self.container = av.open(self.address, timeout=(TelloStream.FRAME_GRAB_TIMEOUT, None), **options)
         except av.error.ExitError:
             raise TelloException('Failed to grab video frames from video stream')
 
-        self.stopped = False
+        if decoder_threads is not None:
+            stream = self.container.streams.video[0]
+            stream.thread_type = 'AUTO'
+            stream.thread_count = decoder_threads
+
+        self._stop_event = Event()
         self.worker = Thread(target=self.update_frame, args=(), daemon=True)
 
     def start(self) -> None:
@@ -45,28 +97,67 @@ class BackgroundFrameRead:
         """Thread worker function to retrieve frames using PyAV
         Internal method, you normally wouldn't call this yourself.
         """
+        output_format = self.output_format
+        width, height = self.output_size or (None, None)
+        reformat = output_format is not None or self.output_size is not None
+        # OpenCV's SIMD YUV420 to RGB/BGR conversion beats swscale, used if there is nothing to scale
+        cv2_conversion = None
+        if self.opencv_conversion and self.output_size is None:
+            cv2_conversion = {'rgb24': cv2.COLOR_YUV2RGB_I420, 'bgr24': cv2.COLOR_YUV2BGR_I420}.get(output_format)
+        # frame.to_ndarray(format=...) sets up a new swscale context for every frame,
+        # a reformatter kept for the whole stream reuses it
+        reformatter = VideoReformatter()
+        stopped = self._stop_event.is_set
+        append = self.frames.append if self.with_queue else None
+        stream = self.container.streams.video[0]
+        failures = 0
         try:
-            for frame in self.container.decode(video=0):
-                if self.with_queue:
-                    self.frames.append(np.array(frame.to_image()))
-                else:
-                    self.frame = np.array(frame.to_image())
-
-                if self.stopped:
-                    self.container.close()
-                    break
+            for packet in self.container.demux(stream):
+                # Lost UDP packets leave the decoder with undecodable data. Resetting its state is
+                # enough to resume at the next keyframe, only give up if that keeps failing
+                try:
+                    frames = stream.decode(packet)
+                except av.error.InvalidDataError:
+                    failures += 1
+                    if failures >= BackgroundFrameRead.MAX_DECODE_FAILURES:
+                        self.container.close()
+                        raise TelloException('Failed to decode {} video packets in a row'.format(failures))
+                    stream.codec_context.flush_buffers()
+                    continue
+                failures = 0
+
+                for frame in frames:
+                    # checked before converting, a frame decoded after stop() is discarded right away
+                    if stopped():
+                        self.container.close()
+                        return
+
+                    if cv2_conversion is not None and frame.format.name == 'yuv420p':
+                        # the planes are copied into one (height * 3/2, width) array without conversion
+                        frame = cv2.cvtColor(frame.to_ndarray(), cv2_conversion)
+                    elif reformat:
+                        frame = reformatter.reformat(frame, width, height, output_format)
+                        if output_format is not None:
+                            frame = frame.to_ndarray()
+
+                    if append is not None:
+                        append(frame)
+                    else:
+                        self.frame = frame
         except av.error.ExitError:
             raise TelloException('Do not have enough frames for decoding, please try again or increase video fps before get_frame_read()')
     
     def get_queued_frame(self):
         """
-        Get a frame from the queue
+        Get the oldest frame from the queue, or None if it is empty. The queue holds
+        up to `maxsize` frames, older ones are dropped if they are not fetched in time.
         """
-        with self.lock:
-            try:
-                return self.frames.popleft()
-            except IndexError:
-                return None
+        # deque.append and deque.popleft are atomic, the decoder thread appends
+        # and the consumer pops without a lock
+        try:
+            return self.frames.popleft()
+        except IndexError:
+            return None
 
     @property
     def frame(self):
@@ -76,19 +167,24 @@ class BackgroundFrameRead:
         if self.with_queue:
             return self.get_queued_frame()
 
-        with self.lock:
-            return self._frame
+        # Only the decoder thread writes the frame, it replaces the reference as a whole.
+        # Loading and storing an attribute is atomic, no lock is needed here
+        return self._frame
 
     @frame.setter
     def frame(self, value) -> None:
-        with self.lock:
-            self._frame = value
+        self._frame = value
 
     def stop(self) -> None:
         """Stop the frame update worker
         Internal method, you normally wouldn't call this yourself.
         """
-        self.stopped = True
+        self._stop_event.set()
+
+    @property
+    def stopped(self) -> bool:
+        """Whether stop() was called"""
+        return self._stop_event.is_set()
 
 
 class TelloStream:
@@ -98,6 +194,9 @@ class TelloStream:
     VS_MULTICAST_UDP_PORT = DEFAULT_VS_MULTICAST_UDP_PORT
 
     FRAME_GRAB_TIMEOUT = 5
+    # Kernel receive buffer FFmpeg requests for the video socket. The default (~200KB on Linux)
+    # overflows on keyframe bursts, the lost packets show up as corrupted frames
+    VIDEO_RECV_BUFFER_SIZE = 4 * 1024 * 1024  # in bytes
 
     def __init__(self, tello_id: str, host: str = TELLO_MULTICAST_IP, vs_port: int = VS_MULTICAST_UDP_PORT, if_ip: Union[str, None] = None) -> None:
         
@@ -110,18 +209,27 @@ class TelloStream:
     def get_udp_video_address(self) -> str:
         """Internal method, you normally wouldn't call this youself.
         """
-        address_schema = 'udp://@{ip}:{port}?localaddr={if_ip}'
-        return address_schema.format(ip=self.host, port=self.vs_port, if_ip=self.if_ip)
+        # overrun_nonfatal: keep reading if FFmpeg's receive fifo overflows instead of failing the stream
+        address_schema = 'udp://@{ip}:{port}?localaddr={if_ip}&buffer_size={buffer_size}&overrun_nonfatal=1'
+        return address_schema.format(ip=self.host, port=self.vs_port, if_ip=self.if_ip, buffer_size=TelloStream.VIDEO_RECV_BUFFER_SIZE)
     
-    def get_frame_read(self, with_queue = False, max_queue_len = 32) -> BackgroundFrameRead:
+    def get_frame_read(self, with_queue = False, max_queue_len = 32, hwaccel = None, output_format = 'rgb24',
+                       output_size: Union[Tuple[int, int], None] = None, decoder_threads: Union[int, None] = None,
+                       opencv_conversion: bool = False) -> BackgroundFrameRead:
         """Get the BackgroundFrameRead object from the camera drone. Then, you just need to call
         backgroundFrameRead.frame to get the actual frame received by the drone.
+        Arguments:
+            hwaccel: optional PyAV HWAccel to decode the stream on the GPU, see [BackgroundFrameRead]
+            output_format: pixel format of the frames, None for raw av.VideoFrames, see [BackgroundFrameRead]
+            output_size: optional (width, height) to scale the frames to
+            decoder_threads: optional number of decoding threads, 0 for one per core, see [BackgroundFrameRead]
+            opencv_conversion: convert rgb24/bgr24 frames with OpenCV instead of swscale, see [BackgroundFrameRead]
         Returns:
             BackgroundFrameRead
         """
         if self.background_frame_read is None:
             address = self.get_udp_video_address()
-            self.background_frame_read = BackgroundFrameRead(address, with_queue, max_queue_len)
+            self.background_frame_read = BackgroundFrameRead(address, with_queue, max_queue_len, hwaccel, output_format, output_size, decoder_threads, opencv_conversion)
             self.background_frame_read.start()
         return self.background_frame_read
     
@@ -151,8 +259,9 @@ class TelloSwarmStream:
             path: path to the json file
         """
 
-        with open(path, 'r', encoding='utf-8') as fd:
-            definition = json.load(fd)
+        with open(path, 'rb') as fd:
+            data = fd.read()
+        definition = orjson.loads(data) if orjson is not None else json.loads(data)
 
         return TelloSwarmStream.fromJsonList(definition, if_ip)
 
@@ -2,28 +2,142 @@
 """
 
 import json
+import logging
+import os
 
-from threading import Thread, Barrier
-from queue import Queue
-from typing import List, Callable, Union
+from functools import partial
+from threading import Thread, Lock, Event, BrokenBarrierError
+from typing import List, Callable, Union, Dict, Optional
 
 from .logger import TelloLogger
 from .communication import TelloCommunication
 from .tello import Tello, TelloException
 
+try:
+    import orjson  # optional, faster json parser
+except ImportError:
+    orjson = None
+
+
+class _HybridBarrier:
+    """Reusable barrier for `parties` threads, a drop-in for the `threading.Barrier`
+    methods used by TelloSwarm. Arriving threads only take a lock to increment a
+    counter, the last one releases all others with a single Event and swaps in a
+    fresh one for the next round. threading.Barrier instead wakes each waiting
+    thread through a Condition, one after the other.
+
+    A thread that times out withdraws its arrival and raises BrokenBarrierError.
+    Unlike threading.Barrier the barrier is not broken by that: the other threads
+    keep waiting and later rounds work without a reset().
+    """
+
+    def __init__(self, parties: int) -> None:
+        self.parties = parties
+        self._lock = Lock()
+        self._count = 0
+        self._event = Event()
+
+    def wait(self, timeout: float = None) -> int:
+        """Wait until all parties arrived. Returns the arrival index from 0 to parties - 1."""
+
+        with self._lock:
+            event = self._event
+            index = self._count
+            self._count += 1
+            if self._count == self.parties:
+                self._count = 0
+                self._event = Event()
+                event.set()
+                return index
+
+        if not event.wait(timeout):
+            with self._lock:
+                # the last party may have arrived in the meantime
+                if not event.is_set():
+                    self._count -= 1
+                    raise BrokenBarrierError
+
+        return index
+
+
+class _Latch:
+    """Count-down latch: wait() returns once count_down() was called `count` times.
+    Only the last call wakes the waiting thread.
+    """
+
+    __slots__ = ('_count', '_lock', '_event')
+
+    def __init__(self, count: int) -> None:
+        self._count = count
+        self._lock = Lock()
+        self._event = Event()
+
+    def count_down(self) -> None:
+        with self._lock:
+            self._count -= 1
+            if self._count == 0:
+                self._event.set()
+
+    def wait(self) -> None:
+        self._event.wait()
+
+
+class _Worker:
+    """Thread running the calls of TelloSwarm._dispatch for one drone"""
+
+    __slots__ = ('swarm', 'index', 'tello', 'core', 'start', 'error', 'thread')
+
+    def __init__(self, swarm: 'TelloSwarm', index: int, tello: Tello, core: Optional[int]) -> None:
+        self.swarm = swarm
+        self.index = index
+        self.tello = tello
+        self.core = core
+        # read before the thread starts: a call dispatched while the thread is still starting
+        # up replaces swarm._start, a worker reading it later would wait for the next call
+        self.start = swarm._start
+        # exception of the last call, re-raised by TelloSwarm._dispatch
+        self.error: Optional[Exception] = None
+        self.thread = Thread(target=self.run, daemon=True, name="tello-swarm-worker-{}".format(index))
+
+    def run(self) -> None:
+        swarm = self.swarm
+        i = self.index
+
+        if self.core is not None:
+            try:
+                # pid 0 is the calling thread
+                os.sched_setaffinity(0, {self.core})
+            except OSError as e:
+                TelloLogger.warning("Could not pin the worker of tello {} to CPU {}: {}".format(i, self.core, e))
+
+        start = self.start
+        while True:
+            start.wait()
+            start = swarm._start
+            if swarm._current_call is None:
+                # published by TelloSwarm.end
+                return
+            functions, args, kwargs = swarm._current_call
+            # always report back, otherwise parallel() would wait forever for a failed worker
+            try:
+                functions[i](*args, **kwargs)
+            except Exception as e:
+                self.error = e
+            finally:
+                swarm._done.count_down()
+
 
 class TelloSwarm:
     """Swarm library for controlling multiple Tellos simultaneously
     """
 
     tellos: List[Tello]
-    barrier: Barrier
-    funcBarier: Barrier
-    funcQueues: List[Queue]
+    barrier: _HybridBarrier
     threads: List[Thread]
 
     @staticmethod
-    def fromJsonFile(path: str, if_ip: str, forward_video_stream: bool = False) -> 'TelloSwarm':
+    def fromJsonFile(path: str, if_ip: str, forward_video_stream: bool = False, video_workers: int = 0, cpu_affinity: Optional[Dict[str, int]] = None, pin_workers: bool = False,
+                 recv_buffer_size: Optional[int] = None, send_buffer_size: Optional[int] = None) -> 'TelloSwarm':
         """Create TelloSwarm from a json file. The file should contain a list of IP addresses.
 
         The json structure should look like this:
@@ -41,13 +155,15 @@ class TelloSwarm:
             path: path to the json file
         """
 
-        with open(path, 'r', encoding='utf-8') as fd:
-            definition = json.load(fd)
+        with open(path, 'rb') as fd:
+            data = fd.read()
+        definition = orjson.loads(data) if orjson is not None else json.loads(data)
 
-        return TelloSwarm.fromJsonList(definition, if_ip, forward_video_stream)
+        return TelloSwarm.fromJsonList(definition, if_ip, forward_video_stream, video_workers, cpu_affinity, pin_workers, recv_buffer_size, send_buffer_size)
 
     @staticmethod
-    def fromJsonList(definition: list, if_ip: str, forward_video_stream: bool = False) -> 'TelloSwarm':
+    def fromJsonList(definition: list, if_ip: str, forward_video_stream: bool = False, video_workers: int = 0, cpu_affinity: Optional[Dict[str, int]] = None, pin_workers: bool = False,
+                 recv_buffer_size: Optional[int] = None, send_buffer_size: Optional[int] = None) -> 'TelloSwarm':
         """Create TelloSwarm from a json object.
 
         The json structure should look like this:
@@ -69,18 +185,28 @@ class TelloSwarm:
         for d in definition:
             tellos.append(Tello(tello_id=d['id'], host=d['ip'], vs_port=d['vs_port']))
 
-        return TelloSwarm(tellos, if_ip, forward_video_stream)
+        return TelloSwarm(tellos, if_ip, forward_video_stream, video_workers, cpu_affinity, pin_workers, recv_buffer_size, send_buffer_size)
 
-    def __init__(self, tellos: List[Tello], if_ip: str, forward_video_stream: bool = False) -> None:
+    def __init__(self, tellos: List[Tello], if_ip: str, forward_video_stream: bool = False, video_workers: int = 0, cpu_affinity: Optional[Dict[str, int]] = None, pin_workers: bool = False,
+                 recv_buffer_size: Optional[int] = None, send_buffer_size: Optional[int] = None) -> None:
         """Initialize a TelloSwarm instance
 
         Arguments:
             tellos: list of [Tello] instances
+            video_workers: number of threads forwarding the video streams, see [TelloCommunication]
+            cpu_affinity: cores to pin the communication threads to, see [TelloCommunication]
+            pin_workers: pin the worker thread of each drone to its own core, round-robin over
+                the cores available to the process. Keeps the workers from migrating between
+                cores, which steadies the command latency. Linux only, ignored elsewhere.
+            recv_buffer_size: receive buffer of the control and state sockets, see [TelloCommunication]
+            send_buffer_size: send buffer of the control and state sockets, see [TelloCommunication]
         """
         self.tellos = tellos
+        self._n = len(tellos)
+        self._by_ip: Dict[str, Tello] = {tello.address[0]: tello for tello in tellos}
         self.if_ip = if_ip
         self.forward_video_stream = forward_video_stream
-        self.communication = TelloCommunication(self.forward_video_stream)
+        self.communication = TelloCommunication(self.forward_video_stream, video_workers, cpu_affinity, recv_buffer_size, send_buffer_size)
 
         for i, tello in enumerate(self.tellos):
             self.communication.add_udp_control_handler(tello.address[0], tello.udp_control_receiver)
@@ -89,30 +215,52 @@ class TelloSwarm:
                 self.communication.add_udp_video_stream_handler(self.if_ip, tello.vs_port)
             tello.set_send_command_fn(self.communication.send_command)
 
-        self.barrier = Barrier(len(tellos))
-        self.funcBarrier = Barrier(len(tellos) + 1)
-        self.funcQueues = [Queue() for tello in tellos]
-
-        def worker(i):
-            queue = self.funcQueues[i]
-            tello = self.tellos[i]
-
-            while True:
-                func = queue.get()
-                self.funcBarrier.wait()
-                func(i, tello)
-                self.funcBarrier.wait()
-
-        self.threads = []
-        for i, _ in enumerate(tellos):
-            thread = Thread(target=worker, daemon=True, args=(i,))
-            thread.start()
-            self.threads.append(thread)
+        self.barrier = _HybridBarrier(len(tellos))
+        # The call run by the workers, published once for all of them as a tuple of
+        # (functions, args, kwargs): worker i calls functions[i](*args, **kwargs). Each call
+        # sets the start event the workers wait on, after replacing it with a fresh one for
+        # the next call. So a worker done early can't run the same call twice, and no event
+        # has to be cleared. Every worker counts down the latch of the call once it finished.
+        self._current_call = None
+        self._start = Event()
+        self._done: Optional[_Latch] = None
+
+        # sched_getaffinity is Linux only
+        cores = sorted(os.sched_getaffinity(0)) if pin_workers and hasattr(os, 'sched_getaffinity') else []
+
+        self._workers: List[_Worker] = []
+        for i, tello in enumerate(tellos):
+            worker = _Worker(self, i, tello, cores[i % len(cores)] if cores else None)
+            worker.thread.start()
+            self._workers.append(worker)
+        self.threads = [worker.thread for worker in self._workers]
 
     def start(self) -> None:
         """Start the communication threads."""
         self.communication.start()
 
+    def end(self, timeout: float = None) -> None:
+        """Call `end` on all tellos in parallel, e.g. to land them, then shut the swarm down:
+        the worker threads exit and the shared communication is stopped.
+
+        Unlike the other commands, which are forwarded to each tello, this ends the swarm
+        itself. `parallel`, `sync` and the tello commands don't work anymore afterwards,
+        and the communication can't be started again. Create a new TelloSwarm instead.
+        Arguments:
+            timeout: seconds to wait for each thread to exit, None waits until it did
+        """
+
+        self._dispatch([tello.end for tello in self.tellos], (), {})
+
+        # wake the workers without a call to run, they exit
+        start = self._start
+        self._current_call = None
+        start.set()
+        for thread in self.threads:
+            thread.join(timeout)
+
+        self.communication.stop(timeout)
+
     def sequential(self, func: Callable[[int, Tello], None]) -> None:
         """Call `func` for each tello sequentially. The function retrieves
         two arguments: The index `i` of the current drone and `tello` the
@@ -132,21 +280,50 @@ class TelloSwarm:
         current [Tello][tello] instance.
 
         You can use `swarm.sync()` for syncing between threads.
+        Returns once all calls finished. If some raised, the exception of the
+        first failed drone is raised.
 
         ```python
         swarm.parallel(lambda i, tello: tello.move_up(50 + i * 10))
         ```
         """
 
-        for queue in self.funcQueues:
-            queue.put(func)
+        self._dispatch([partial(func, i, tello) for i, tello in enumerate(self.tellos)], (), {})
 
-        self.funcBarrier.wait()
-        self.funcBarrier.wait()
+    def _dispatch(self, functions: List[Callable], args: tuple, kwargs: dict) -> None:
+        """Call functions[i](*args, **kwargs) on the worker of each drone i and wait for all of them.
+        Internal method, use `parallel` instead.
+        """
+
+        # nothing runs in parallel with a single drone, skip the hand-over to its worker
+        if self._n == 1:
+            functions[0](*args, **kwargs)
+            return
 
-    def sync(self, timeout: float = None) -> None:
+        start = self._start
+        self._current_call = (functions, args, kwargs)
+        done = self._done = _Latch(self._n)
+        self._start = Event()
+        start.set()
+
+        done.wait()
+
+        # raise like the single drone call above, the first failed drone's exception
+        failed = [worker for worker in self._workers if worker.error is not None]
+        if failed:
+            for worker in failed[1:]:
+                TelloLogger.error("Error in parallel call for tello {}: {}".format(worker.index, worker.error))
+            error = failed[0].error
+            for worker in failed:
+                worker.error = None
+            raise error
+
+    def sync(self, timeout: float = None) -> int:
         """Sync parallel tello threads. The code continues when all threads
-        have called `swarm.sync`.
+        have called `swarm.sync`. If `timeout` seconds pass first, the calling
+        thread stops waiting and raises `threading.BrokenBarrierError`.
+        Returns the arrival index of the calling thread, from 0 to len(swarm) - 1,
+        like `threading.Barrier.wait`.
 
         ```python
         def doStuff(i, tello):
@@ -161,18 +338,15 @@ class TelloSwarm:
         swarm.parallel(doStuff)
         ```
         """
+        # a single drone has nobody to wait for
+        if self._n == 1:
+            return 0
         return self.barrier.wait(timeout)
 
     def by_ip(self, ip: str) -> Union[Tello, None]:
         """Get a tello by its IP address."""
 
-        tello_found = None
-        for tello in self.tellos:
-            if tello.address[0] == ip:
-                tello_found = tello
-                break
-        
-        return tello_found
+        return self._by_ip.get(ip)
 
     def add_video_stream_multicast_destination(self, local_port: int, destination_multicast_ip: str, destination_multicast_port: int) -> None:
         """Add a multicast destination for the video stream."""
@@ -192,6 +366,25 @@ class TelloSwarm:
 
         self.communication.remove_video_stream_multicast_destination(local_port, destination_multicast_ip, destination_multicast_port)
 
+    def send_rc_control(self, left_right_velocity: int, forward_backward_velocity: int, up_down_velocity: int, yaw_velocity: int) -> None:
+        """Send the same RC control to all tellos, see [Tello.send_rc_control].
+        Instead of going through the worker threads, the commands of all drones are
+        sent at once, on Linux with a single system call.
+        """
+
+        # rc commands are sent at a high rate and info is often filtered out, only format if it is not
+        log = TelloLogger.isEnabledFor(logging.INFO)
+        commands = []
+        for tello in self.tellos:
+            cmd = tello._rc_control_command(left_right_velocity, forward_backward_velocity, up_down_velocity, yaw_velocity)
+            if cmd is not None:
+                if log:
+                    TelloLogger.info("Send command (no response expected): '{}'".format(cmd.decode('ascii')))
+                commands.append((cmd, tello.address))
+
+        if commands:
+            self.communication.send_command_batch(commands)
+
     def __getattr__(self, attr) -> Callable:
         """Call a standard tello function in parallel on all tellos.
 
@@ -201,9 +394,14 @@ class TelloSwarm:
         swarm.move_up(50)
         ```
         """
+        methods = [getattr(tello, attr) for tello in self.tellos]
+
         def callAll(*args, **kwargs):
-            self.parallel(lambda i, tello: getattr(tello, attr)(*args, **kwargs))
+            self._dispatch(methods, args, kwargs)
 
+        # __getattr__ is only called if the normal lookup fails. Stored on the instance,
+        # later calls find callAll directly and the methods are resolved exactly once
+        self.__dict__[attr] = callAll
         return callAll
 
     def __iter__(self):
@@ -223,4 +421,4 @@ class TelloSwarm:
         print("Tello count: {}".format(len(swarm)))
         ```
         """
-        return len(self.tellos)
+        return self._n
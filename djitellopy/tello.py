@@ -2,8 +2,17 @@
 """
 
 # coding=utf-8
+import asyncio
+import functools
+import logging
+import re
+import sys
 import time
-from typing import Union, Type, Dict, Tuple, List, Any
+import types
+import weakref
+from collections import deque
+from threading import Event, RLock
+from typing import Optional, Union, Type, Dict, List, Mapping, Tuple, Any
 from .logger import TelloLogger
 
 
@@ -11,11 +20,152 @@ class TelloException(Exception):
     pass
 
 
+class TelloCommandError(TelloException):
+    """Raised when a command was unsuccessful after all retries.
+    The message is only formatted when the exception is printed.
+    """
+
+    def __init__(self, command: Union[str, bytes], tries: int, response: str) -> None:
+        super().__init__(command, tries, response)
+        self.command = command
+        self.tries = tries
+        self.response = response
+
+    def __str__(self) -> str:
+        return "Command '{}' was unsuccessful for {} tries. Latest response:\t'{}'".format(
+            _command_text(self.command), self.tries, self.response)
+
+
+def _decode_response(response: bytes) -> str:
+    return response.decode("utf-8", "replace")
+
+
+def _query_command(command: bytes, read, parse=None):
+    """Turn a query stub into sending command with read(self, command), one of the
+    send_read_command variants, and returning the response or parse(response). The query
+    keeps the stub's name, signature and docstring, its body is not used.
+    """
+    def decorator(stub):
+        # read and parse are closure cells, there is no attribute lookup per call
+        if parse is None:
+            @functools.wraps(stub)
+            def query(self):
+                return read(self, command)
+        else:
+            @functools.wraps(stub)
+            def query(self):
+                return parse(read(self, command))
+        return query
+    return decorator
+
+
+def _clamp100(x: int) -> int:
+    return -100 if x < -100 else (100 if x > 100 else x)
+
+
+def _state_field_getter(key: str):
+    """Turn a getter stub into a direct lookup of the state field key. The getter keeps
+    the stub's name, signature and docstring, its body is not used.
+    """
+    def decorator(stub):
+        @functools.wraps(stub)
+        def getter(self):
+            try:
+                return self._state_snapshot[key]
+            except KeyError:
+                raise TelloException('Could not get state property: {}'.format(key)) from None
+        return getter
+    return decorator
+
+
+# bits of _CleanupState.todo
+_CLEANUP_LAND = 1
+_CLEANUP_STREAM = 2
+
+
+class _CleanupState:
+    """What a Tello still has to undo when it is ended, garbage collected or the interpreter
+    exits, as a bitmask of _CLEANUP_* bits. Shared with its finalizer, which must not
+    reference the Tello itself.
+    """
+
+    __slots__ = ('send_command_fn', 'address', 'todo')
+
+    def __init__(self, address: Tuple[str, int]) -> None:
+        self.send_command_fn = None
+        self.address = address
+        self.todo = 0
+
+    def set(self, bit: int, value: bool) -> None:
+        if value:
+            self.todo |= bit
+        else:
+            self.todo &= ~bit
+
+
+class _Flight:
+    """A read command in flight, callers with the same command wait for its outcome."""
+
+    __slots__ = ('done', 'response', 'error')
+
+    def __init__(self) -> None:
+        self.done = Event()
+        self.response: Union[bytes, str, None] = None
+        self.error: Optional[Exception] = None
+
+
+def _finalize_tello(state: _CleanupState) -> None:
+    """Land and stop the stream of a Tello that was not ended. The commands are sent without
+    waiting for a response, nothing may block the garbage collector or the interpreter exit.
+    """
+    send = state.send_command_fn
+    if send is None:
+        return
+    try:
+        for bit, command in ((_CLEANUP_LAND, b'land'), (_CLEANUP_STREAM, b'streamoff')):
+            if state.todo & bit:
+                send(command, state.address)
+    except OSError:
+        # the communication sockets may already be closed
+        pass
+
+
+def _async_twin(method):
+    """Coroutine version of a blocking Tello method, named <method>_async. The method runs
+    in the event loop's default executor, queries to several drones overlap.
+    """
+    async def twin(self, *args, **kwargs):
+        # get_event_loop instead of get_running_loop / asyncio.to_thread, for Python 3.6
+        call = functools.partial(method, self, *args, **kwargs)
+        return await asyncio.get_event_loop().run_in_executor(None, call)
+
+    twin.__name__ = method.__name__ + '_async'
+    twin.__qualname__ = method.__qualname__ + '_async'
+    twin.__doc__ = "Coroutine version of [{}], awaiting it doesn't block the event loop.".format(method.__name__)
+    return twin
+
+
+def _command_text(command: Union[str, bytes]) -> str:
+    """Commands can be sent as str or as ASCII bytes, shown as str in logs and errors."""
+    return command.decode('ascii') if isinstance(command, bytes) else command
+
+
 class Tello:
     """Python wrapper to interact with the Ryze Tello drone using the official Tello api.
     Tello API documentation:
     [1.3](https://dl-cdn.ryzerobotics.com/downloads/tello/20180910/Tello%20SDK%20Documentation%20EN_1.3.pdf),
     [2.0 with EDU-only commands](https://dl-cdn.ryzerobotics.com/downloads/Tello/Tello%20SDK%202.0%20User%20Guide.pdf)
+
+    Use it as a context manager to call `end` when done, e.g. to land the drone:
+
+    ```python
+    with Tello('0') as tello:
+        tello.connect()
+        tello.takeoff()
+    ```
+
+    A Tello that is garbage collected or still flying when the interpreter exits is sent
+    `land` (and `streamoff`) without waiting for the responses.
     """
     # Send and receive commands, client socket
     RESPONSE_TIMEOUT = 7  # in seconds
@@ -23,7 +173,14 @@ class Tello:
     FRAME_GRAB_TIMEOUT = 5
     TIME_BTW_COMMANDS = 0.1  # in seconds
     TIME_BTW_RC_CONTROL_COMMANDS = 0.001  # in seconds
+    # unchanged rc velocities are only sent again after this time, as a keepalive
+    RC_CONTROL_KEEPALIVE_INTERVAL = 0.2  # in seconds
     RETRY_COUNT = 3  # number of retries after a failed command
+    QUERY_CACHE_TTL = 0.1  # in seconds, query responses are reused for this long
+    # query_many waits this long for responses that arrive after its timeout, see _discard_late_responses
+    LATE_RESPONSE_TIMEOUT = 1  # in seconds
+    # the drone sends state packets about 10 times a second, after this long without one it is unreachable
+    STATE_SILENCE_TIMEOUT = 2  # in seconds
     TELLO_IP = '192.168.10.1'  # Tello IP address
 
     # Video stream, server socket
@@ -62,12 +219,37 @@ class Tello:
     )
     FLOAT_STATE_FIELDS = ('baro', 'agx', 'agy', 'agz')
 
-    state_field_converters: Dict[str, Union[Type[int], Type[float]]]
+    # read-only, parse_state works on the _state_fields table derived from it
+    state_field_converters: Mapping[str, Union[Type[int], Type[float]]]
     state_field_converters = {key : int for key in INT_STATE_FIELDS}
     state_field_converters.update({key : float for key in FLOAT_STATE_FIELDS})
-
-    stream_on = False
-    is_flying = False
+    state_field_converters = types.MappingProxyType(state_field_converters)
+
+    # 'key:value' fields of a state line, separated by ';'. State packets are parsed as
+    # received, as bytes: int() and float() accept bytes, only the keys have to be decoded
+    STATE_FIELD_PATTERN = re.compile(rb'([^;:\r\n]+):([^;:\r\n]*)')
+    # The raw key of every known field maps to its interned name, dict lookups with it compare
+    # by identity, and its converter. A single lookup per field, mpry stays a string
+    _state_fields: Dict[bytes, Tuple[str, Any]] = {key.encode('ascii'): (sys.intern(key), conv) for key, conv in state_field_converters.items()}
+    _state_fields[b'mpry'] = (sys.intern('mpry'), bytes.decode)
+
+    # Error responses of read commands, e.g. 'error', 'error Not joystick', 'False', or the
+    # 'response decode error' of send_command_with_return. Only matched at the start, so
+    # a regular value containing one of the words is not mistaken for an error
+    RESPONSE_ERROR_PATTERN = re.compile(r'error|false|response decode error', re.IGNORECASE)
+    # the same for the undecoded responses of send_read_bytes
+    RESPONSE_ERROR_BYTES_PATTERN = re.compile(rb'error|false', re.IGNORECASE)
+    # the distance in a tof? response, e.g. b'801mm'
+    TOF_RESPONSE_PATTERN = re.compile(rb'\s*(\d+)')
+
+    # Fixed instance attributes: no per-instance __dict__, attribute access in the hot
+    # paths (rc control, the receivers) is a slot load. Subclasses can add attributes as usual
+    __slots__ = (
+        'tello_id', 'address', 'vs_port', 'retry_count', 'send_command_fn', '_cleanup',
+        'last_received_command_timestamp', 'last_rc_control_timestamp', '_last_rc_control',
+        'responses_state_dict', '_response_event', '_state_snapshot', '_state_timestamp', '_state_received',
+        '_query_cache', '_inflight', '_command_lock', '__weakref__',
+    )
 
     def __init__(self, tello_id: str, host: str = TELLO_IP, vs_port: int = VS_PORT, retry_count: int = RETRY_COUNT) -> None:
 
@@ -77,17 +259,54 @@ class Tello:
         self.retry_count: int = retry_count
 
         self.send_command_fn = None
-        self.stream_on: bool = False
-        self.last_received_command_timestamp: float = time.time()
-        self.last_rc_control_timestamp: float = time.time()
-        self.responses_state_dict: Dict[str, Union[List, Dict]] = {'responses': [], 'state': {}}
-
-        TelloLogger.info("Tello instance was initialized. Host: '{}'. Port: '{}'.".format(host, Tello.CONTROL_UDP_PORT))
+        # backs is_flying and stream_on, end and the finalizer undo what its bits say
+        self._cleanup = _CleanupState(self.address)
+        weakref.finalize(self, _finalize_tello, self._cleanup)
+        # time.monotonic() timestamps, unaffected by changes of the system clock
+        self.last_received_command_timestamp: float = time.monotonic()
+        self.last_rc_control_timestamp: float = time.monotonic()
+        self._last_rc_control: Optional[Tuple[int, int, int, int]] = None
+        self.responses_state_dict: Dict[str, deque] = {'responses': deque()}
+        # The state receiver replaces the whole dict with every packet and never modifies it,
+        # readers load the reference once and get a consistent snapshot without a lock
+        self._state_snapshot: Dict[str, Union[int, float, str]] = {}
+        self._state_timestamp: float = 0  # time.monotonic() of the snapshot
+        # set once the first state packet was parsed, connect waits on it
+        self._state_received = Event()
+        # query command -> (time.monotonic() of the response, response), see _cached_send_read_bytes
+        self._query_cache: Dict[bytes, Tuple[float, bytes]] = {}
+        # query command -> its _Flight while it waits for a response, see _shared_send_read_bytes
+        self._inflight: Dict[bytes, _Flight] = {}
+        # set by the control receiver for every response, send_command_with_return waits on it
+        self._response_event = Event()
+        # reentrant, query_many falls back to send_read_command while holding it
+        self._command_lock = RLock()
+
+        TelloLogger.info("Tello instance was initialized. Host: '%s'. Port: '%s'.", host, Tello.CONTROL_UDP_PORT)
 
     def set_send_command_fn(self, fn) -> None:
         """Set the function to use for sending commands to the Tello.
         """
         self.send_command_fn = fn
+        self._cleanup.send_command_fn = fn
+
+    @property
+    def is_flying(self) -> bool:
+        """Whether the drone took off and did not land since"""
+        return bool(self._cleanup.todo & _CLEANUP_LAND)
+
+    @is_flying.setter
+    def is_flying(self, value: bool) -> None:
+        self._cleanup.set(_CLEANUP_LAND, value)
+
+    @property
+    def stream_on(self) -> bool:
+        """Whether the video stream was turned on and not off since"""
+        return bool(self._cleanup.todo & _CLEANUP_STREAM)
+
+    @stream_on.setter
+    def stream_on(self, value: bool) -> None:
+        self._cleanup.set(_CLEANUP_STREAM, value)
 
     def change_vs_udp(self, udp_port) -> None:
         """Change the UDP Port for sending video feed from the drone.
@@ -95,9 +314,9 @@ class Tello:
         self.vs_port = udp_port
         self.send_control_command(f'port 8890 {self.vs_port}')
 
-    def get_own_udp_object(self) -> Dict[str, Union[List, Dict]]:
+    def get_own_udp_object(self) -> Dict[str, deque]:
         """This object is filled
-        with responses and state information by the receiver threads.
+        with responses by the control receiver thread. The state is kept in get_current_state.
         Internal method, you normally wouldn't call this yourself.
         """
 
@@ -107,202 +326,219 @@ class Tello:
         """Setup UDP receiver. This method listens for control packets from Tello."""
         
         address = address[0]
-        TelloLogger.debug('Data received from {} at client_socket'.format(address))
+        # formatted lazily, only if debug logging is enabled: this runs for every packet
+        TelloLogger.debug('Data received from %s at client_socket', address)
 
         if address == self.address[0]:
             self.get_own_udp_object()['responses'].append(data)
+            self._response_event.set()
 
     def udp_state_receiver(self, data, address) -> None:
         """Setup UDP receiver. This method listens for state packets from Tello."""
 
         address = address[0]
-        TelloLogger.debug('Data received from {} at state_socket'.format(address))
+        TelloLogger.debug('Data received from %s at state_socket', address)
 
         if address == self.address[0]:
-            data = data.decode('ASCII')
-            self.get_own_udp_object()['state'] = self.parse_state(data)
-
-    def parse_state(self, state: str) -> Dict[str, Union[int, float, str]]:
-        """Parse a state line to a dictionary
+            self._state_snapshot = state = self.parse_state(data)
+            # stored after the snapshot, a snapshot is at least as recent as the timestamp read before it
+            self._state_timestamp = time.monotonic()
+            if state and not self._state_received.is_set():
+                self._state_received.set()
+
+    def parse_state(self, state: bytes) -> Dict[str, Union[int, float, str]]:
+        """Parse a state packet, as received, to a dictionary
         Internal method, you normally wouldn't call this yourself.
         """
-        state = state.strip()
-        TelloLogger.debug('Raw state data: {}'.format(state))
-
-        if state == 'ok':
-            return {}
+        if TelloLogger.isEnabledFor(logging.DEBUG):
+            TelloLogger.debug('Raw state data: {}'.format(state.decode('ascii', 'replace').strip()))
 
+        # Not stripped: line breaks are excluded by the pattern and a stray 'ok' contains no
+        # 'key:value' field, both are skipped without copying the packet first
+        field = Tello._state_fields.get
         state_dict = {}
-        for field in state.split(';'):
-            split = field.split(':')
-            if len(split) < 2:
+        for key, value in Tello.STATE_FIELD_PATTERN.findall(state):
+            entry = field(key)
+            if entry is None:
+                # unknown fields are kept as strings
+                state_dict[sys.intern(key.decode('ascii'))] = value.decode('ascii')
                 continue
 
-            key = split[0]
-            value: Union[int, float, str] = split[1]
-
-            if key in Tello.state_field_converters:
-                num_type = Tello.state_field_converters[key]
-                try:
-                    value = num_type(value)
-                except ValueError as e:
-                    TelloLogger.debug('Error parsing state value for {}: {} to {}'.format(key, value, num_type))
-                    TelloLogger.error(e)
-                    continue
-
-            state_dict[key] = value
+            name, converter = entry
+            try:
+                state_dict[name] = converter(value)
+            except ValueError as e:
+                # a malformed value, skip just that field
+                TelloLogger.debug('Error parsing state value for %s: %s to %s', name, value, converter)
+                TelloLogger.error(e)
 
         return state_dict
 
+    def parse_state_text(self, state: str) -> Dict[str, Union[int, float, str]]:
+        """Parse a decoded state line to a dictionary, see [parse_state]
+        Internal method, you normally wouldn't call this yourself.
+        """
+        return self.parse_state(state.encode('ascii'))
+
     def get_current_state(self) -> Dict:
         """Call this function to attain the state of the Tello. Returns a dict
         with all fields.
         Internal method, you normally wouldn't call this yourself.
         """
-        return self.get_own_udp_object()['state']
+        return self._state_snapshot
 
     def get_state_field(self, key: str) -> Any:
         """Get a specific sate field by name.
         Internal method, you normally wouldn't call this yourself.
         """
-        state = self.get_current_state()
+        # read directly, the getters below are called at a high rate in control loops
+        try:
+            return self._state_snapshot[key]
+        except KeyError:
+            raise TelloException('Could not get state property: {}'.format(key)) from None
 
-        if key in state:
-            return state[key]
-        else:
-            raise TelloException('Could not get state property: {}'.format(key))
+    def _recent_state(self, max_age: Optional[float]) -> Dict:
+        """The state snapshot if it is at most max_age seconds old, else an empty dict.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        if max_age is None or time.monotonic() - self._state_timestamp > max_age:
+            return {}
+        return self._state_snapshot
 
+    @_state_field_getter('mid')
     def get_mission_pad_id(self) -> int:
         """Mission pad ID of the currently detected mission pad
         Only available on Tello EDUs after calling enable_mission_pads
         Returns:
             int: -1 if none is detected, else 1-8
         """
-        return self.get_state_field('mid')
 
+    @_state_field_getter('x')
     def get_mission_pad_distance_x(self) -> int:
         """X distance to current mission pad
         Only available on Tello EDUs after calling enable_mission_pads
         Returns:
             int: distance in cm
         """
-        return self.get_state_field('x')
 
+    @_state_field_getter('y')
     def get_mission_pad_distance_y(self) -> int:
         """Y distance to current mission pad
         Only available on Tello EDUs after calling enable_mission_pads
         Returns:
             int: distance in cm
         """
-        return self.get_state_field('y')
 
+    @_state_field_getter('z')
     def get_mission_pad_distance_z(self) -> int:
         """Z distance to current mission pad
         Only available on Tello EDUs after calling enable_mission_pads
         Returns:
             int: distance in cm
         """
-        return self.get_state_field('z')
 
+    @_state_field_getter('pitch')
     def get_pitch(self) -> int:
         """Get pitch in degree
         Returns:
             int: pitch in degree
         """
-        return self.get_state_field('pitch')
 
+    @_state_field_getter('roll')
     def get_roll(self) -> int:
         """Get roll in degree
         Returns:
             int: roll in degree
         """
-        return self.get_state_field('roll')
 
+    @_state_field_getter('yaw')
     def get_yaw(self) -> int:
         """Get yaw in degree
         Returns:
             int: yaw in degree
         """
-        return self.get_state_field('yaw')
 
+    @_state_field_getter('vgx')
     def get_speed_x(self) -> int:
         """X-Axis Speed
         Returns:
             int: speed
         """
-        return self.get_state_field('vgx')
 
+    @_state_field_getter('vgy')
     def get_speed_y(self) -> int:
         """Y-Axis Speed
         Returns:
             int: speed
         """
-        return self.get_state_field('vgy')
 
+    @_state_field_getter('vgz')
     def get_speed_z(self) -> int:
         """Z-Axis Speed
         Returns:
             int: speed
         """
-        return self.get_state_field('vgz')
 
+    @_state_field_getter('agx')
     def get_acceleration_x(self) -> float:
         """X-Axis Acceleration
         Returns:
             float: acceleration
         """
-        return self.get_state_field('agx')
 
+    @_state_field_getter('agy')
     def get_acceleration_y(self) -> float:
         """Y-Axis Acceleration
         Returns:
             float: acceleration
         """
-        return self.get_state_field('agy')
 
+    @_state_field_getter('agz')
     def get_acceleration_z(self) -> float:
         """Z-Axis Acceleration
         Returns:
             float: acceleration
         """
-        return self.get_state_field('agz')
 
+    @_state_field_getter('templ')
     def get_lowest_temperature(self) -> int:
         """Get lowest temperature
         Returns:
             int: lowest temperature (°C)
         """
-        return self.get_state_field('templ')
 
+    @_state_field_getter('temph')
     def get_highest_temperature(self) -> int:
         """Get highest temperature
         Returns:
             float: highest temperature (°C)
         """
-        return self.get_state_field('temph')
 
     def get_temperature(self) -> float:
         """Get average temperature
         Returns:
             float: average temperature (°C)
         """
-        templ = self.get_lowest_temperature()
-        temph = self.get_highest_temperature()
-        return (templ + temph) / 2
+        # both fields from the same state packet
+        state = self._state_snapshot
+        try:
+            return (state['templ'] + state['temph']) / 2
+        except KeyError as e:
+            raise TelloException('Could not get state property: {}'.format(e.args[0])) from None
 
+    @_state_field_getter('h')
     def get_height(self) -> int:
         """Get current height in cm
         Returns:
             int: height in cm
         """
-        return self.get_state_field('h')
 
+    @_state_field_getter('tof')
     def get_distance_tof(self) -> int:
         """Get current distance value from TOF in cm
         Returns:
             int: TOF distance in cm
         """
-        return self.get_state_field('tof')
 
     def get_barometer(self) -> int:
         """Get current barometer measurement in cm
@@ -313,86 +549,105 @@ class Tello:
         """
         return self.get_state_field('baro') * 100
 
+    @_state_field_getter('time')
     def get_flight_time(self) -> int:
         """Get the time the motors have been active in seconds
         Returns:
             int: flight time in s
         """
-        return self.get_state_field('time')
 
+    @_state_field_getter('bat')
     def get_battery(self) -> int:
         """Get current battery percentage
         Returns:
             int: 0-100
         """
-        return self.get_state_field('bat')
 
-    def send_command_with_return(self, command: str, timeout: int = RESPONSE_TIMEOUT) -> str:
+    def send_command_with_return(self, command: Union[str, bytes], timeout: int = RESPONSE_TIMEOUT) -> str:
         """Send command to Tello and wait for its response.
         Internal method, you normally wouldn't call this yourself.
         Return:
             bool/str: str with response text on success, False when unsuccessfull.
         """
-        # Commands very consecutive makes the drone not respond to them.
-        # So wait at least self.TIME_BTW_COMMANDS seconds
-        diff = time.time() - self.last_received_command_timestamp
-        if diff < self.TIME_BTW_COMMANDS:
-            TelloLogger.debug('Waiting {} seconds to execute command: {}...'.format(diff, command))
-            time.sleep(diff)
+        response = self._send_command_raw(command, timeout)
+        if isinstance(response, str):
+            return response
 
-        TelloLogger.info("Send command: '{}'".format(command))
-        timestamp = time.time()
+        try:
+            return response.decode("utf-8")
+        except UnicodeDecodeError as e:
+            TelloLogger.error(e)
+            return "response decode error"
 
-        self.send_command_fn(command, self.address)
+    def _send_command_raw(self, command: Union[str, bytes], timeout: int = RESPONSE_TIMEOUT) -> Union[bytes, str]:
+        """Send command to Tello and wait for its response.
+        Returns the response as received, without the line break. If there is none,
+        returns a str saying why instead.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        # Responses carry no reference to their command, only one command per drone may wait at a time
+        with self._command_lock:
+            command_text = _command_text(command)
+            # Commands very consecutive makes the drone not respond to them.
+            # So wait at least self.TIME_BTW_COMMANDS seconds
+            wait = self.TIME_BTW_COMMANDS - (time.monotonic() - self.last_received_command_timestamp)
+            if wait > 0:
+                TelloLogger.debug('Waiting %s seconds to execute command: %s...', wait, command_text)
+                time.sleep(wait)
 
-        responses = self.get_own_udp_object()['responses']
+            TelloLogger.info("Send command: '%s'", command_text)
+            timestamp = time.monotonic()
 
-        while not responses:
-            if time.time() - timestamp > timeout:
-                message = "Aborting command '{}'. Did not receive a response after {} seconds".format(command, timeout)
-                TelloLogger.warning(message)
-                return message
-            time.sleep(0.1)  # Sleep during send command
+            self.send_command_fn(command, self.address)
 
-        self.last_received_command_timestamp = time.time()
+            responses = self.get_own_udp_object()['responses']
 
-        first_response = responses.pop(0)  # first datum from socket
-        try:
-            response = first_response.decode("utf-8")
-        except UnicodeDecodeError as e:
-            TelloLogger.error(e)
-            return "response decode error"
-        response = response.rstrip("\r\n")
+            while not responses:
+                remaining = timeout - (time.monotonic() - timestamp)
+                if remaining <= 0 or not self._response_event.wait(remaining):
+                    message = "Aborting command '{}'. Did not receive a response after {} seconds".format(command_text, timeout)
+                    TelloLogger.warning(message)
+                    return message
+                # cleared before checking again, a response appended meanwhile sets it again
+                self._response_event.clear()
 
-        TelloLogger.info("Response {}: '{}'".format(command, response))
-        return response
+            self.last_received_command_timestamp = time.monotonic()
 
-    def send_command_without_return(self, command: str) -> None:
+            response = responses.popleft().rstrip(b"\r\n")  # first datum from socket
+            if TelloLogger.isEnabledFor(logging.INFO):
+                TelloLogger.info("Response %s: '%s'", command_text, response.decode("utf-8", "replace"))
+            return response
+
+    def send_command_without_return(self, command: Union[str, bytes]) -> None:
         """Send command to Tello without expecting a response.
         Internal method, you normally wouldn't call this yourself.
         """
         # Commands very consecutive makes the drone not respond to them. So wait at least self.TIME_BTW_COMMANDS seconds
 
-        TelloLogger.info("Send command (no response expected): '{}'".format(command))
+        if TelloLogger.isEnabledFor(logging.INFO):
+            TelloLogger.info("Send command (no response expected): '{}'".format(_command_text(command)))
         self.send_command_fn(command, self.address)
 
-    def send_control_command(self, command: str, timeout: int = RESPONSE_TIMEOUT) -> bool:
+    def send_control_command(self, command: Union[str, bytes], timeout: int = RESPONSE_TIMEOUT) -> bool:
         """Send control command to Tello and wait for its response.
         Internal method, you normally wouldn't call this yourself.
         """
         response = "max retries exceeded"
         for i in range(0, self.retry_count):
-            response = self.send_command_with_return(command, timeout=timeout)
+            response = self._send_command_raw(command, timeout=timeout)
 
-            if 'ok' in response.lower():
+            # checked on the raw response, a plain 'ok' needs neither decoding nor lowercasing
+            if isinstance(response, bytes) and (response == b'ok' or b'ok' in response.lower()):
                 return True
 
-            TelloLogger.debug("Command attempt #{} failed for command: '{}'".format(i, command))
+            TelloLogger.debug("Command attempt #%s failed for command: '%s'", i, _command_text(command))
 
+        if isinstance(response, bytes):
+            response = response.decode("utf-8", "replace")
         self.raise_result_error(command, response)
         return False # never reached
 
-    def send_read_command(self, command: str) -> str:
+    def send_read_command(self, command: Union[str, bytes]) -> str:
         """Send given command to Tello and wait for its response.
         Internal method, you normally wouldn't call this yourself.
         """
@@ -404,13 +659,89 @@ class Tello:
         except TypeError as e:
             TelloLogger.error(e)
 
-        if any(word in response for word in ('error', 'ERROR', 'False')):
+        if Tello.RESPONSE_ERROR_PATTERN.match(response):
             self.raise_result_error(command, response)
             return "Error: this code should never be reached"
 
         return response
 
-    def send_read_command_int(self, command: str) -> int:
+    def send_read_bytes(self, command: Union[str, bytes]) -> bytes:
+        """Like send_read_command, but returns the response undecoded, e.g. for int(response).
+        The query_* methods read through it. Like send_read_command it raises TelloCommandError
+        if the command returns an error, and returns the 'Aborting command' message, here
+        encoded, if there is no response.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        response = self._send_read_raw(command)
+        if isinstance(response, str):
+            return response.encode("utf-8")
+        return response
+
+    def _send_read_raw(self, command: Union[str, bytes]) -> Union[bytes, str]:
+        """Like send_read_bytes, but returns the 'Aborting command' message as str if there
+        is no response, so it can be told apart from one.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        response = self._send_command_raw(command)
+        if isinstance(response, bytes) and Tello.RESPONSE_ERROR_BYTES_PATTERN.match(response):
+            self.raise_result_error(command, response.decode("utf-8", "replace"))
+        return response
+
+    def _cached_send_read_bytes(self, command: bytes, ttl: Optional[float] = QUERY_CACHE_TTL) -> bytes:
+        """Like send_read_bytes, but reuses a response received less than ttl seconds ago.
+        With ttl None a response is reused forever, for values that never change.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        cached = self._query_cache.get(command)
+        if cached is not None and (ttl is None or time.monotonic() - cached[0] < ttl):
+            return cached[1]
+
+        # errors raise before anything is cached
+        response = self._shared_send_read_raw(command)
+        if isinstance(response, str):
+            # no response, the next call asks the drone again
+            return response.encode("utf-8")
+        self._query_cache[command] = (time.monotonic(), response)
+        return response
+
+    def _shared_send_read_bytes(self, command: bytes) -> bytes:
+        """Like send_read_bytes, but callers sending the same command while it is in flight
+        share its round trip and get its response, or its error, too.
+        Must not be called while holding _command_lock, the caller in flight may wait for it.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        response = self._shared_send_read_raw(command)
+        if isinstance(response, str):
+            return response.encode("utf-8")
+        return response
+
+    def _shared_send_read_raw(self, command: bytes) -> Union[bytes, str]:
+        """_send_read_raw shared like _shared_send_read_bytes.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        flight = _Flight()
+        # setdefault is atomic, exactly one of the concurrent callers installs its flight
+        leader = self._inflight.setdefault(command, flight)
+        if leader is not flight:
+            leader.done.wait()
+            if leader.error is not None:
+                raise leader.error
+            if leader.response is not None:
+                return leader.response
+            # the caller in flight was interrupted without an outcome
+            return self._send_read_raw(command)
+
+        try:
+            flight.response = self._send_read_raw(command)
+            return flight.response
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            del self._inflight[command]
+            flight.done.set()
+
+    def send_read_command_int(self, command: Union[str, bytes]) -> int:
         """Send given command to Tello and wait for its response.
         Parses the response to an integer
         Internal method, you normally wouldn't call this yourself.
@@ -418,7 +749,7 @@ class Tello:
         response = self.send_read_command(command)
         return int(response)
 
-    def send_read_command_float(self, command: str) -> float:
+    def send_read_command_float(self, command: Union[str, bytes]) -> float:
         """Send given command to Tello and wait for its response.
         Parses the response to an integer
         Internal method, you normally wouldn't call this yourself.
@@ -426,49 +757,107 @@ class Tello:
         response = self.send_read_command(command)
         return float(response)
 
-    def raise_result_error(self, command: str, response: str) -> bool:
+    def query_many(self, commands: List[Union[str, bytes]], timeout: int = RESPONSE_TIMEOUT) -> Dict[Union[str, bytes], str]:
+        """Send several read commands, e.g. ['battery?', 'tof?', 'wifi?'], and return their
+        responses by command. The commands are sent TIME_BTW_COMMANDS apart without waiting
+        for each response in between, so the round trips overlap. If not every command was
+        answered in time, the responses can't be matched to the commands anymore and the
+        commands are sent again one by one.
+        Raises TelloCommandError if a command returns an error.
+        """
+        with self._command_lock:
+            responses = self.get_own_udp_object()['responses']
+            # responses to earlier, timed out commands would be matched to the wrong command
+            responses.clear()
+
+            for command in commands:
+                wait = self.TIME_BTW_COMMANDS - (time.monotonic() - self.last_received_command_timestamp)
+                if wait > 0:
+                    time.sleep(wait)
+                TelloLogger.info("Send command: '%s'", _command_text(command))
+                self.send_command_fn(command, self.address)
+                # the drone needs the same spacing between commands whether or not they were answered
+                self.last_received_command_timestamp = time.monotonic()
+
+            timestamp = time.monotonic()
+            while len(responses) < len(commands):
+                remaining = timeout - (time.monotonic() - timestamp)
+                if remaining <= 0 or not self._response_event.wait(remaining):
+                    TelloLogger.warning("Received {} of {} responses to {}, querying one by one".format(
+                        len(responses), len(commands), [_command_text(command) for command in commands]))
+                    self._discard_late_responses(len(commands))
+                    return {command: self.send_read_command(command) for command in commands}
+                self._response_event.clear()
+
+            self.last_received_command_timestamp = time.monotonic()
+
+            results = {}
+            error = None
+            for command in commands:
+                response = responses.popleft().rstrip(b"\r\n").decode("utf-8", "replace")
+                TelloLogger.info("Response %s: '%s'", _command_text(command), response)
+                if error is None and Tello.RESPONSE_ERROR_PATTERN.match(response):
+                    error = (command, response)
+                results[command] = response
+
+            # only raised once every response is taken, a later command would get the rest
+            if error is not None:
+                self.raise_result_error(*error)
+            return results
+
+    def _discard_late_responses(self, count: int) -> None:
+        """Drop the responses to count commands that were sent but timed out, including those
+        that are still on their way, so they are not taken for the responses of the next
+        commands. The drone may not answer some commands at all, so waiting stops once no
+        response arrived for LATE_RESPONSE_TIMEOUT seconds.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        responses = self.get_own_udp_object()['responses']
+        while True:
+            # cleared before taking, a response appended meanwhile sets it again
+            self._response_event.clear()
+            while responses and count > 0:
+                responses.popleft()
+                count -= 1
+            if count <= 0 or not self._response_event.wait(Tello.LATE_RESPONSE_TIMEOUT):
+                break
+
+    def raise_result_error(self, command: Union[str, bytes], response: str) -> bool:
         """Used to reaise an error after an unsuccessful command
         Internal method, you normally wouldn't call this yourself.
         """
-        tries = 1 + self.retry_count
-        raise TelloException("Command '{}' was unsuccessful for {} tries. Latest response:\t'{}'".format(command, tries, response))
+        raise TelloCommandError(command, 1 + self.retry_count, response)
 
     def connect(self, wait_for_state=True) -> None:
         """Enter SDK mode. Call this before any of the control functions.
         """
-        self.send_control_command("command")
+        self.send_control_command(b'command')
 
         if wait_for_state:
-            REPS = 20
-            for i in range(REPS):
-                if self.get_current_state():
-                    t = i / REPS  # in seconds
-                    TelloLogger.debug("'.connect()' received first state packet after {} seconds".format(t))
-                    break
-                time.sleep(1 / REPS)
-
-            if not self.get_current_state():
+            timestamp = time.monotonic()
+            if not self._state_received.wait(1):
                 raise TelloException('Did not receive a state packet from the Tello')
+            TelloLogger.debug("'.connect()' received first state packet after %s seconds", time.monotonic() - timestamp)
 
     def send_keepalive(self) -> None:
         """Send a keepalive packet to prevent the drone from landing after 15s
         """
-        self.send_control_command("keepalive")
+        self.send_control_command(b'keepalive')
 
     def turn_motor_on(self) -> None:
         """Turn on motors without flying (mainly for cooling)
         """
-        self.send_control_command("motoron")
+        self.send_control_command(b'motoron')
 
     def turn_motor_off(self) -> None:
         """Turns off the motor cooling mode
         """
-        self.send_control_command("motoroff")
+        self.send_control_command(b'motoroff')
 
     def initiate_throw_takeoff(self) -> None:
         """Allows you to take off by throwing your drone within 5 seconds of this command
         """
-        self.send_control_command("throwfly")
+        self.send_control_command(b'throwfly')
         self.is_flying = True
 
     def takeoff(self) -> None:
@@ -476,13 +865,13 @@ class Tello:
         """
         # Something it takes a looooot of time to take off and return a succesful takeoff.
         # So we better wait. Otherwise, it would give us an error on the following calls.
-        self.send_control_command("takeoff", timeout=Tello.TAKEOFF_TIMEOUT)
+        self.send_control_command(b'takeoff', timeout=Tello.TAKEOFF_TIMEOUT)
         self.is_flying = True
 
     def land(self) -> None:
         """Automatic landing.
         """
-        self.send_control_command("land")
+        self.send_control_command(b'land')
         self.is_flying = False
 
     def streamon(self) -> None:
@@ -498,19 +887,19 @@ class Tello:
         """
         if self.DEFAULT_VS_PORT != self.vs_port:
             self.change_vs_udp(self.vs_port)
-        self.send_control_command("streamon")
+        self.send_control_command(b'streamon')
         self.stream_on = True
 
     def streamoff(self) -> None:
         """Turn off video streaming.
         """
-        self.send_control_command("streamoff")
+        self.send_control_command(b'streamoff')
         self.stream_on = False
 
     def emergency(self) -> None:
         """Stop all motors immediately.
         """
-        self.send_command_without_return("emergency")
+        self.send_command_without_return(b'emergency')
         self.is_flying = False
 
     def move(self, direction: str, x: int) -> None:
@@ -569,14 +958,14 @@ class Tello:
         Arguments:
             x: 1-360
         """
-        self.send_control_command("cw {}".format(x))
+        self.send_control_command(b'cw %d' % x)
 
     def rotate_counter_clockwise(self, x: int) -> None:
         """Rotate x degree counter-clockwise.
         Arguments:
             x: 1-3600
         """
-        self.send_control_command("ccw {}".format(x))
+        self.send_control_command(b'ccw %d' % x)
 
     def flip(self, direction: str) -> None:
         """Do a flip maneuver.
@@ -615,7 +1004,7 @@ class Tello:
             z: -500-500
             speed: 10-100
         """
-        cmd = 'go {} {} {} {}'.format(x, y, z, speed)
+        cmd = b'go %d %d %d %d' % (x, y, z, speed)
         self.send_control_command(cmd)
 
     def curve_xyz_speed(self, x1: int, y1: int, z1: int, x2: int, y2: int, z2: int, speed: int) -> None:
@@ -635,7 +1024,7 @@ class Tello:
             z2: -500-500
             speed: 10-60
         """
-        cmd = 'curve {} {} {} {} {} {} {}'.format(x1, y1, z1, x2, y2, z2, speed)
+        cmd = b'curve %d %d %d %d %d %d %d' % (x1, y1, z1, x2, y2, z2, speed)
         self.send_control_command(cmd)
 
     def go_xyz_speed_mid(self, x: int, y: int, z: int, speed: int, mid: int) -> None:
@@ -648,7 +1037,7 @@ class Tello:
             speed: 10-100
             mid: 1-8
         """
-        cmd = 'go {} {} {} {} m{}'.format(x, y, z, speed, mid)
+        cmd = b'go %d %d %d %d m%d' % (x, y, z, speed, mid)
         self.send_control_command(cmd)
 
     def curve_xyz_speed_mid(self, x1: int, y1: int, z1: int, x2: int, y2: int, z2: int, speed: int, mid: int) -> None:
@@ -669,7 +1058,7 @@ class Tello:
             speed: 10-60
             mid: 1-8
         """
-        cmd = 'curve {} {} {} {} {} {} {} m{}'.format(x1, y1, z1, x2, y2, z2, speed, mid)
+        cmd = b'curve %d %d %d %d %d %d %d m%d' % (x1, y1, z1, x2, y2, z2, speed, mid)
         self.send_control_command(cmd)
 
     def go_xyz_speed_yaw_mid(self, x: int, y: int, z: int, speed: int, yaw: int, mid1: int, mid2: int) -> None:
@@ -685,18 +1074,18 @@ class Tello:
             mid1: 1-8
             mid2: 1-8
         """
-        cmd = 'jump {} {} {} {} {} m{} m{}'.format(x, y, z, speed, yaw, mid1, mid2)
+        cmd = b'jump %d %d %d %d %d m%d m%d' % (x, y, z, speed, yaw, mid1, mid2)
         self.send_control_command(cmd)
 
     def enable_mission_pads(self) -> None:
         """Enable mission pad detection
         """
-        self.send_control_command("mon")
+        self.send_control_command(b'mon')
 
     def disable_mission_pads(self) -> None:
         """Disable mission pad detection
         """
-        self.send_control_command("moff")
+        self.send_control_command(b'moff')
 
     def set_mission_pad_detection_direction(self, x) -> None:
         """Set mission pad detection direction. enable_mission_pads needs to be
@@ -712,29 +1101,40 @@ class Tello:
         Arguments:
             x: 10-100
         """
-        self.send_control_command("speed {}".format(x))
+        self.send_control_command(b'speed %d' % x)
 
     def send_rc_control(self, left_right_velocity: int, forward_backward_velocity: int, up_down_velocity: int, yaw_velocity: int) -> None:
         """Send RC control via four channels. Command is sent every self.TIME_BTW_RC_CONTROL_COMMANDS seconds.
+        Unchanged velocities are only sent again every self.RC_CONTROL_KEEPALIVE_INTERVAL seconds.
         Arguments:
             left_right_velocity: -100~100 (left/right)
             forward_backward_velocity: -100~100 (forward/backward)
             up_down_velocity: -100~100 (up/down)
             yaw_velocity: -100~100 (yaw)
         """
-        def clamp100(x: int) -> int:
-            return max(-100, min(100, x))
-
-        if time.time() - self.last_rc_control_timestamp > self.TIME_BTW_RC_CONTROL_COMMANDS:
-            self.last_rc_control_timestamp = time.time()
-            cmd = 'rc {} {} {} {}'.format(
-                clamp100(left_right_velocity),
-                clamp100(forward_backward_velocity),
-                clamp100(up_down_velocity),
-                clamp100(yaw_velocity)
-            )
+        cmd = self._rc_control_command(left_right_velocity, forward_backward_velocity, up_down_velocity, yaw_velocity)
+        if cmd is not None:
             self.send_command_without_return(cmd)
 
+    def _rc_control_command(self, left_right_velocity: int, forward_backward_velocity: int, up_down_velocity: int, yaw_velocity: int) -> Optional[bytes]:
+        """Build the rc command for send_rc_control, None if the last one was sent too recently
+        or has the same velocities and the keepalive interval did not pass yet.
+        Internal method, also used by TelloSwarm to send the commands of all drones at once.
+        """
+        now = time.monotonic()
+        elapsed = now - self.last_rc_control_timestamp
+        if elapsed <= self.TIME_BTW_RC_CONTROL_COMMANDS:
+            return None
+
+        velocities = (_clamp100(left_right_velocity), _clamp100(forward_backward_velocity),
+                      _clamp100(up_down_velocity), _clamp100(yaw_velocity))
+        if velocities == self._last_rc_control and elapsed < self.RC_CONTROL_KEEPALIVE_INTERVAL:
+            return None
+
+        self.last_rc_control_timestamp = now
+        self._last_rc_control = velocities
+        return b'rc %d %d %d %d' % velocities
+
     def set_wifi_credentials(self, ssid: str, password: str) -> None:
         """Set the Wi-Fi SSID and password. The Tello will reboot afterwords.
         """
@@ -760,7 +1160,7 @@ class Tello:
     def reboot(self) -> None:
         """Reboots the drone
         """
-        self.send_command_without_return('reboot')
+        self.send_command_without_return(b'reboot')
 
     def set_video_bitrate(self, bitrate: int) -> None:
         """Sets the bitrate of the video stream
@@ -812,111 +1212,201 @@ class Tello:
         cmd = 'EXT {}'.format(expansion_cmd)
         self.send_control_command(cmd)
 
+    @_query_command(b'speed?', _shared_send_read_bytes, int)
     def query_speed(self) -> int:
         """Query speed setting (cm/s)
         Returns:
             int: 1-100
         """
-        return self.send_read_command_int('speed?')
 
-    def query_battery(self) -> int:
+    def query_battery(self, max_age: Optional[float] = None) -> int:
         """Get current battery percentage via a query command
         Using get_battery is usually faster
+        Arguments:
+            max_age: use the state packets instead if the last one is at most max_age seconds old
         Returns:
             int: 0-100 in %
         """
-        return self.send_read_command_int('battery?')
+        state = self._recent_state(max_age)
+        if 'bat' in state:
+            return state['bat']
+        return int(self._shared_send_read_bytes(b'battery?'))
 
-    def query_flight_time(self) -> int:
+    def query_flight_time(self, max_age: Optional[float] = None) -> int:
         """Query current fly time (s).
         Using get_flight_time is usually faster.
+        Arguments:
+            max_age: use the state packets instead if the last one is at most max_age seconds old
         Returns:
             int: Seconds elapsed during flight.
         """
-        return self.send_read_command_int('time?')
+        state = self._recent_state(max_age)
+        if 'time' in state:
+            return state['time']
+        return int(self._shared_send_read_bytes(b'time?'))
 
-    def query_height(self) -> int:
+    def query_height(self, max_age: Optional[float] = None) -> int:
         """Get height in cm via a query command.
         Using get_height is usually faster
+        Arguments:
+            max_age: use the state packets instead if the last one is at most max_age seconds old
         Returns:
             int: 0-3000
         """
-        return self.send_read_command_int('height?')
+        state = self._recent_state(max_age)
+        if 'h' in state:
+            return state['h']
+        return int(self._shared_send_read_bytes(b'height?'))
 
-    def query_temperature(self) -> int:
+    def query_temperature(self, max_age: Optional[float] = None) -> int:
         """Query temperature (°C).
         Using get_temperature is usually faster.
+        Arguments:
+            max_age: use the state packets instead if the last one is at most max_age seconds old.
+                Their average temperature is rounded down, get_temperature returns it as a float
         Returns:
             int: 0-90
         """
-        return self.send_read_command_int('temp?')
+        state = self._recent_state(max_age)
+        if 'templ' in state and 'temph' in state:
+            return (state['templ'] + state['temph']) // 2
+        return int(self._shared_send_read_bytes(b'temp?'))
 
-    def query_attitude(self) -> dict:
+    def query_attitude(self, max_age: Optional[float] = None) -> dict:
         """Query IMU attitude data.
         Using get_pitch, get_roll and get_yaw is usually faster.
+        Arguments:
+            max_age: use the state packets instead if the last one is at most max_age seconds old
         Returns:
             {'pitch': int, 'roll': int, 'yaw': int}
         """
-        response = self.send_read_command('attitude?')
+        state = self._recent_state(max_age)
+        if 'pitch' in state and 'roll' in state and 'yaw' in state:
+            return {'pitch': state['pitch'], 'roll': state['roll'], 'yaw': state['yaw']}
+        response = self._shared_send_read_bytes(b'attitude?')
         return self.parse_state(response)
 
-    def query_barometer(self) -> int:
+    def query_barometer(self, max_age: Optional[float] = None) -> int:
         """Get barometer value (cm)
         Using get_barometer is usually faster.
+        Arguments:
+            max_age: use the state packets instead if the last one is at most max_age seconds old
         Returns:
             int: 0-100
         """
-        baro = self.send_read_command_int('baro?')
+        state = self._recent_state(max_age)
+        if 'baro' in state:
+            return state['baro'] * 100
+        baro = int(self._shared_send_read_bytes(b'baro?'))
         return baro * 100
 
-    def query_distance_tof(self) -> float:
+    def query_distance_tof(self, max_age: Optional[float] = None) -> float:
         """Get distance value from TOF (cm)
         Using get_distance_tof is usually faster.
+        A response is reused for Tello.QUERY_CACHE_TTL seconds.
+        Arguments:
+            max_age: use the state packets instead if the last one is at most max_age seconds old
         Returns:
             float: 30-1000
         """
+        state = self._recent_state(max_age)
+        if 'tof' in state:
+            return float(state['tof'])
         # example response: 801mm
-        tof = self.send_read_command('tof?')
-        return int(tof[:-2]) / 10
+        tof = self._cached_send_read_bytes(b'tof?')
+        match = Tello.TOF_RESPONSE_PATTERN.match(tof)
+        if match is None:
+            raise TelloException("Unexpected response to 'tof?': '{}'".format(tof.decode("utf-8", "replace")))
+        return int(match.group(1)) / 10
 
+    @_query_command(b'wifi?', _cached_send_read_bytes, _decode_response)
     def query_wifi_signal_noise_ratio(self) -> str:
         """Get Wi-Fi SNR
+        A response is reused for Tello.QUERY_CACHE_TTL seconds.
         Returns:
             str: snr
         """
-        return self.send_read_command('wifi?')
 
+    @_query_command(b'sdk?', functools.partial(_cached_send_read_bytes, ttl=None), _decode_response)
     def query_sdk_version(self) -> str:
         """Get SDK Version
+        Only queried once, the version does not change.
         Returns:
             str: SDK Version
         """
-        return self.send_read_command('sdk?')
 
+    @_query_command(b'sn?', functools.partial(_cached_send_read_bytes, ttl=None), _decode_response)
     def query_serial_number(self) -> str:
         """Get Serial Number
+        Only queried once, the serial number does not change.
         Returns:
             str: Serial Number
         """
-        return self.send_read_command('sn?')
 
+    @_query_command(b'active?', _cached_send_read_bytes, _decode_response)
     def query_active(self) -> str:
         """Get the active status
+        A response is reused for Tello.QUERY_CACHE_TTL seconds.
         Returns:
             str
         """
-        return self.send_read_command('active?')
+
+    # e.g. `battery, tof = await asyncio.gather(tello.query_battery_async(), other.query_distance_tof_async())`.
+    # Queries to the same drone still run one after another, its responses can't be told apart
+    query_many_async = _async_twin(query_many)
+    query_speed_async = _async_twin(query_speed)
+    query_battery_async = _async_twin(query_battery)
+    query_flight_time_async = _async_twin(query_flight_time)
+    query_height_async = _async_twin(query_height)
+    query_temperature_async = _async_twin(query_temperature)
+    query_attitude_async = _async_twin(query_attitude)
+    query_barometer_async = _async_twin(query_barometer)
+    query_distance_tof_async = _async_twin(query_distance_tof)
+    query_wifi_signal_noise_ratio_async = _async_twin(query_wifi_signal_noise_ratio)
+    query_sdk_version_async = _async_twin(query_sdk_version)
+    query_serial_number_async = _async_twin(query_serial_number)
+    query_active_async = _async_twin(query_active)
+
+    def _is_reachable(self) -> bool:
+        """False if the drone sent state packets but stopped, e.g. because it is out of range.
+        Without any state packets there is no telling, it is assumed to be reachable.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        return (not self._state_received.is_set()
+                or time.monotonic() - self._state_timestamp <= Tello.STATE_SILENCE_TIMEOUT)
 
     def end(self) -> None:
         """Call this method when you want to end the tello object
         """
+        if not self._cleanup.todo:
+            return
+        if not self._is_reachable():
+            # waiting for the responses would only time out after all retries, send the
+            # commands anyway in case the drone comes back into range
+            _finalize_tello(self._cleanup)
+            # sent once, not again by a later end() or the finalizer
+            self._cleanup.todo = 0
+            return
+
+        # a reachable drone can still fail to respond
         try:
-            if self.is_flying:
-                self.land()
-            if self.stream_on:
-                self.streamoff()
+            # land and streamoff clear their bit
+            for bit, undo in ((_CLEANUP_LAND, self.land), (_CLEANUP_STREAM, self.streamoff)):
+                if self._cleanup.todo & bit:
+                    undo()
         except TelloException:
             pass
 
-    def __del__(self):
+    async def end_async(self) -> None:
+        """Like end, for asyncio code. The blocking commands run in the loop's default
+        executor, so several drones can be ended concurrently, e.g. with
+        `await asyncio.gather(*(tello.end_async() for tello in tellos))`.
+        """
+        # get_event_loop instead of get_running_loop / asyncio.to_thread, for Python 3.6
+        await asyncio.get_event_loop().run_in_executor(None, self.end)
+
+    def __enter__(self) -> 'Tello':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
         self.end()
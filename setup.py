@@ -23,8 +23,7 @@ setuptools.setup(
     install_requires=[
         'numpy',
         'opencv-python',
-        'av',
-        'pillow'
+        'av'
     ],
     python_requires='>=3.6',
     classifiers=[
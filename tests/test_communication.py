@@ -0,0 +1,125 @@
+import socket
+import sys
+import unittest
+from unittest import mock
+
+from djitellopy import TelloCommunication, TelloLogger, mmsg
+
+
+def _kernel_limit(name):
+    try:
+        with open('/proc/sys/net/core/{}'.format(name)) as f:
+            return int(f.read())
+    except OSError:
+        return None
+
+
+@unittest.skipUnless(sys.platform.startswith('linux') and _kernel_limit('rmem_max'), 'needs the Linux buffer limits')
+class BufferSizeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(self.sock.close)
+        # Linux doubles the set size, more than twice the limit is capped
+        self.capped_size = 2 * _kernel_limit('rmem_max') + 4096
+        patch = mock.patch.object(TelloCommunication, '_default_buffer_cap_logged', False)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_requested_size_warns(self):
+        with mock.patch.object(TelloLogger, 'warning') as warning:
+            TelloCommunication._set_buffer_size(self.sock, socket.SO_RCVBUF, self.capped_size, True)
+            TelloCommunication._set_buffer_size(self.sock, socket.SO_RCVBUF, self.capped_size, True)
+        self.assertEqual(warning.call_count, 2)
+
+    def test_default_size_is_logged_once_at_info(self):
+        with mock.patch.object(TelloLogger, 'warning') as warning, mock.patch.object(TelloLogger, 'info') as info:
+            TelloCommunication._set_buffer_size(self.sock, socket.SO_RCVBUF, self.capped_size)
+            TelloCommunication._set_buffer_size(self.sock, socket.SO_RCVBUF, self.capped_size)
+        warning.assert_not_called()
+        self.assertEqual(info.call_count, 1)
+
+    def test_size_within_limit_is_not_logged(self):
+        with mock.patch.object(TelloLogger, 'warning') as warning, mock.patch.object(TelloLogger, 'info') as info:
+            TelloCommunication._set_buffer_size(self.sock, socket.SO_RCVBUF, 64 * 1024, True)
+        warning.assert_not_called()
+        info.assert_not_called()
+
+
+
+def _free_udp_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class VideoForwardTest(unittest.TestCase):
+
+    def setUp(self):
+        self.communication = TelloCommunication(forward_video_stream=True)
+        self.addCleanup(self.communication.stop, 1)
+        self.port = _free_udp_port()
+        self.communication.add_udp_video_stream_handler('127.0.0.1', self.port)
+        self.communication.start()
+
+        self.drone = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(self.drone.close)
+        self.receivers = []
+        for _ in range(3):
+            receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            receiver.bind(('127.0.0.1', 0))
+            receiver.settimeout(1)
+            self.addCleanup(receiver.close)
+            self.receivers.append(receiver)
+
+    def add_destination(self, receiver):
+        self.communication.add_video_stream_multicast_destination(self.port, *receiver.getsockname())
+
+    def stream(self, *datagrams):
+        for data in datagrams:
+            self.drone.sendto(data, ('127.0.0.1', self.port))
+
+    def received(self, receiver, count):
+        return [receiver.recv(2048) for _ in range(count)]
+
+    def test_every_destination_gets_every_datagram(self):
+        for receiver in self.receivers:
+            self.add_destination(receiver)
+        self.stream(b'frame 1', b'frame 2', b'frame 3')
+        for receiver in self.receivers:
+            self.assertEqual(self.received(receiver, 3), [b'frame 1', b'frame 2', b'frame 3'])
+
+    def test_single_destination(self):
+        self.add_destination(self.receivers[0])
+        self.stream(b'frame 1', b'frame 2')
+        self.assertEqual(self.received(self.receivers[0], 2), [b'frame 1', b'frame 2'])
+
+    def test_removed_destination_gets_nothing_more(self):
+        first, second = self.receivers[:2]
+        self.add_destination(first)
+        self.add_destination(second)
+        self.stream(b'frame 1')
+        self.assertEqual(self.received(first, 1), [b'frame 1'])
+        self.assertEqual(self.received(second, 1), [b'frame 1'])
+
+        self.communication.remove_video_stream_multicast_destination(self.port, *second.getsockname())
+        self.stream(b'frame 2')
+        self.assertEqual(self.received(first, 1), [b'frame 2'])
+        second.settimeout(0.2)
+        with self.assertRaises(socket.timeout):
+            second.recv(2048)
+
+
+
+class VideoForwardWithoutMmsgTest(VideoForwardTest):
+    """The same, with the recvfrom/sendto fallback used where recvmmsg/sendmmsg are unavailable"""
+
+    def setUp(self):
+        patch = mock.patch.object(mmsg, 'AVAILABLE', False)
+        patch.start()
+        self.addCleanup(patch.stop)
+        super().setUp()
+
+
+if __name__ == '__main__':
+    unittest.main()
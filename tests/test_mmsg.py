@@ -0,0 +1,97 @@
+import socket
+import unittest
+
+from djitellopy import mmsg
+
+
+def _udp_socket():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    return sock
+
+
+@unittest.skipUnless(mmsg.AVAILABLE, 'recvmmsg/sendmmsg are Linux only')
+class RecvBatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.receiver = _udp_socket()
+        self.sender = _udp_socket()
+        self.addCleanup(self.receiver.close)
+        self.addCleanup(self.sender.close)
+
+    def send(self, *datagrams):
+        for data in datagrams:
+            self.sender.sendto(data, self.receiver.getsockname())
+
+    def test_receives_queued_datagrams_in_order(self):
+        self.send(b'a', b'bb', b'ccc')
+        batch = mmsg.RecvBatch(batch_size=8)
+        self.assertEqual([bytes(view) for view in batch.recv(self.receiver)], [b'a', b'bb', b'ccc'])
+
+    def test_at_most_batch_size_per_call(self):
+        self.send(*[bytes([i]) * 10 for i in range(5)])
+        batch = mmsg.RecvBatch(batch_size=3)
+        self.assertEqual([bytes(view) for view in batch.recv(self.receiver)], [b'\0' * 10, b'\1' * 10, b'\2' * 10])
+        self.assertEqual([bytes(view) for view in batch.recv(self.receiver)], [b'\3' * 10, b'\4' * 10])
+
+    def test_empty_socket_raises_blocking_io_error(self):
+        batch = mmsg.RecvBatch(batch_size=4)
+        with self.assertRaises(BlockingIOError):
+            batch.recv(self.receiver)
+
+    def test_datagram_longer_than_buffer_is_truncated(self):
+        self.send(b'x' * 100)
+        batch = mmsg.RecvBatch(batch_size=1, buffer_size=16)
+        self.assertEqual([bytes(view) for view in batch.recv(self.receiver)], [b'x' * 16])
+
+
+
+@unittest.skipUnless(mmsg.AVAILABLE, 'recvmmsg/sendmmsg are Linux only')
+class SendBatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sockets = [_udp_socket() for _ in range(4)]
+        for sock in self.sockets:
+            self.addCleanup(sock.close)
+        self.source, self.sender, *self.destinations = self.sockets
+
+    def receive_batch(self, *datagrams):
+        for data in datagrams:
+            self.sender.sendto(data, self.source.getsockname())
+        return mmsg.RecvBatch(batch_size=8).recv(self.source)
+
+    def test_every_packet_reaches_every_destination(self):
+        packets = self.receive_batch(b'one', b'two', b'three')
+        batch = mmsg.SendBatch([sock.getsockname() for sock in self.destinations], batch_size=8)
+        batch.send(self.sender, packets)
+        for destination in self.destinations:
+            destination.settimeout(1)
+            self.assertEqual([destination.recv(64) for _ in range(3)], [b'one', b'two', b'three'])
+
+    def test_batch_is_reused(self):
+        batch = mmsg.SendBatch([self.destinations[0].getsockname()], batch_size=2)
+        destination = self.destinations[0]
+        destination.settimeout(1)
+        for data in (b'first', b'second'):
+            batch.send(self.sender, self.receive_batch(data))
+            self.assertEqual(destination.recv(64), data)
+
+
+
+@unittest.skipUnless(mmsg.AVAILABLE, 'recvmmsg/sendmmsg are Linux only')
+class SendTest(unittest.TestCase):
+
+    def test_each_datagram_goes_to_its_address(self):
+        sender = _udp_socket()
+        receivers = [_udp_socket() for _ in range(3)]
+        for sock in [sender] + receivers:
+            self.addCleanup(sock.close)
+            sock.settimeout(1)
+
+        mmsg.send(sender, [(b'rc 0 0 0 %d' % i, receiver.getsockname()) for i, receiver in enumerate(receivers)])
+        for i, receiver in enumerate(receivers):
+            self.assertEqual(receiver.recvfrom(64), (b'rc 0 0 0 %d' % i, sender.getsockname()))
+
+
+if __name__ == '__main__':
+    unittest.main()
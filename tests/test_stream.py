@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import av
+import numpy as np
+
+from djitellopy import BackgroundFrameRead
+from djitellopy import stream
+
+
+def _write_video(path, frame_count=3, width=64, height=48):
+    """Encode a short H.264 stream of colored gradients, decoded as yuv420p like the Tello's."""
+    y, x = np.mgrid[0:height, 0:width]
+    with av.open(path, 'w', format='h264') as container:
+        video = container.add_stream('libx264', rate=30)
+        video.width, video.height, video.pix_fmt = width, height, 'yuv420p'
+        for i in range(frame_count):
+            rgb = np.stack([x * 255 // width, y * 255 // height, np.full_like(x, 40 * i)], axis=-1).astype(np.uint8)
+            for packet in video.encode(av.VideoFrame.from_ndarray(rgb, format='rgb24')):
+                container.mux(packet)
+        for packet in video.encode():
+            container.mux(packet)
+
+
+class FrameConversionTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, 'stream.h264')
+        _write_video(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def read_frames(self, **kwargs):
+        frame_read = BackgroundFrameRead(self.path, with_queue=True, **kwargs)
+        frame_read.start()
+        frame_read.worker.join(5)
+        return list(frame_read.frames)
+
+    def test_swscale_is_the_default(self):
+        with mock.patch.object(stream.cv2, 'cvtColor') as cvt_color:
+            frames = self.read_frames()
+        cvt_color.assert_not_called()
+        self.assertEqual(len(frames), 3)
+        self.assertEqual(frames[0].shape, (48, 64, 3))
+        self.assertEqual(frames[0].dtype, np.uint8)
+
+    def test_opencv_conversion(self):
+        with mock.patch.object(stream.cv2, 'cvtColor', wraps=stream.cv2.cvtColor) as cvt_color:
+            frames = self.read_frames(opencv_conversion=True)
+        self.assertEqual(cvt_color.call_count, 3)
+        self.assertEqual(frames[0].shape, (48, 64, 3))
+        self.assertEqual(frames[0].dtype, np.uint8)
+
+    def test_opencv_colors_are_close_to_swscale(self):
+        for output_format in ('rgb24', 'bgr24'):
+            swscale = self.read_frames(output_format=output_format)
+            opencv = self.read_frames(output_format=output_format, opencv_conversion=True)
+            for a, b in zip(swscale, opencv):
+                # same matrix and range, only the chroma upsampling and rounding differ
+                difference = np.abs(a.astype(int) - b.astype(int))
+                self.assertLess(difference.mean(), 2)
+                self.assertLessEqual(difference.max(), 4)
+
+    def test_bgr_is_reversed_rgb(self):
+        for opencv_conversion in (False, True):
+            rgb = self.read_frames(output_format='rgb24', opencv_conversion=opencv_conversion)
+            bgr = self.read_frames(output_format='bgr24', opencv_conversion=opencv_conversion)
+            np.testing.assert_array_equal(rgb[0], bgr[0][..., ::-1])
+
+    def test_opencv_conversion_is_skipped_when_scaling(self):
+        with mock.patch.object(stream.cv2, 'cvtColor') as cvt_color:
+            frames = self.read_frames(output_size=(32, 24), opencv_conversion=True)
+        cvt_color.assert_not_called()
+        self.assertEqual(frames[0].shape, (24, 32, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+import os
+import threading
+import time
+import unittest
+from threading import BrokenBarrierError
+from unittest import mock
+
+from djitellopy import Tello, TelloSwarm
+from djitellopy.swarm import _HybridBarrier
+
+
+def _swarm(count, **kwargs):
+    tellos = [Tello(str(i), host='127.0.0.{}'.format(i + 1)) for i in range(count)]
+    return TelloSwarm(tellos, '127.0.0.1', **kwargs)
+
+
+class DispatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.swarm = _swarm(3)
+        self.addCleanup(self.swarm.end, 1)
+
+    def test_parallel_calls_each_drone_on_its_worker(self):
+        calls = []
+        lock = threading.Lock()
+
+        def record(i, tello):
+            with lock:
+                calls.append((i, tello, threading.current_thread().name))
+
+        self.swarm.parallel(record)
+        self.assertEqual(sorted((i, tello) for i, tello, _ in calls), list(enumerate(self.swarm.tellos)))
+        self.assertEqual(sorted(name for _, _, name in calls), ['tello-swarm-worker-{}'.format(i) for i in range(3)])
+
+    def test_parallel_waits_for_every_drone(self):
+        finished = []
+        self.swarm.parallel(lambda i, tello: (time.sleep(0.01 * i), finished.append(i)))
+        self.assertEqual(sorted(finished), [0, 1, 2])
+
+    def test_repeated_calls(self):
+        counts = [0, 0, 0]
+
+        def count(i, tello):
+            counts[i] += 1
+
+        for _ in range(200):
+            self.swarm.parallel(count)
+        self.assertEqual(counts, [200, 200, 200])
+
+    def test_exception_is_raised_after_all_finished(self):
+        finished = []
+
+        def fail(i, tello):
+            if i == 1:
+                raise ValueError('drone 1')
+            time.sleep(0.01)
+            finished.append(i)
+
+        with self.assertRaisesRegex(ValueError, 'drone 1'):
+            self.swarm.parallel(fail)
+        self.assertEqual(sorted(finished), [0, 2])
+        # the failure is not raised again by the next call
+        self.swarm.parallel(lambda i, tello: None)
+
+    def test_tello_methods_are_called_on_all_drones(self):
+        with mock.patch.object(Tello, 'get_battery', autospec=True, side_effect=lambda tello: tello.tello_id) as get_battery:
+            self.swarm.get_battery()
+        self.assertEqual(sorted(call[0][0].tello_id for call in get_battery.call_args_list), ['0', '1', '2'])
+
+
+class SingleDroneDispatchTest(unittest.TestCase):
+
+    def test_runs_inline_and_raises(self):
+        swarm = _swarm(1)
+        self.addCleanup(swarm.end, 1)
+        threads = []
+        swarm.parallel(lambda i, tello: threads.append(threading.current_thread()))
+        self.assertEqual(threads, [threading.current_thread()])
+        with self.assertRaises(ValueError):
+            swarm.parallel(lambda i, tello: int('x'))
+
+
+@unittest.skipUnless(hasattr(os, 'sched_setaffinity'), 'thread pinning is Linux only')
+class PinnedWorkersTest(unittest.TestCase):
+
+    def test_call_right_after_construction_returns(self):
+        set_affinity = os.sched_setaffinity
+
+        def slow_set_affinity(*args):
+            # the workers start up after the first call was dispatched
+            time.sleep(0.1)
+            set_affinity(*args)
+
+        with mock.patch.object(os, 'sched_setaffinity', slow_set_affinity):
+            swarm = _swarm(3, pin_workers=True)
+            self.addCleanup(swarm.end, 1)
+            thread = threading.Thread(target=swarm.parallel, args=(lambda i, tello: None,), daemon=True)
+            thread.start()
+            thread.join(2)
+        self.assertFalse(thread.is_alive())
+
+
+
+def _run_threads(target, count):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return threads
+
+
+class HybridBarrierTest(unittest.TestCase):
+
+    def test_releases_all_parties_together(self):
+        barrier = _HybridBarrier(4)
+        arrived = []
+        passed = []
+
+        def run(i):
+            time.sleep(0.01 * i)
+            arrived.append(i)
+            barrier.wait(5)
+            # nobody passes before the last one arrived
+            passed.append(len(arrived))
+
+        _run_threads(run, 4)
+        self.assertEqual(passed, [4, 4, 4, 4])
+
+    def test_arrival_indices_and_reuse(self):
+        barrier = _HybridBarrier(3)
+        indices = [[] for _ in range(50)]
+
+        def run(i):
+            for round_indices in indices:
+                round_indices.append(barrier.wait(5))
+
+        _run_threads(run, 3)
+        for round_indices in indices:
+            self.assertEqual(sorted(round_indices), [0, 1, 2])
+
+    def test_single_drone_sync_returns_index_0(self):
+        swarm = _swarm(1)
+        self.addCleanup(swarm.end, 1)
+        indices = []
+        swarm.parallel(lambda i, tello: indices.append(swarm.sync(5)))
+        self.assertEqual(indices, [0])
+
+    def test_timeout_withdraws_the_arrival(self):
+        barrier = _HybridBarrier(2)
+        with self.assertRaises(BrokenBarrierError):
+            barrier.wait(0.05)
+
+        # not broken: the next round still needs both parties
+        indices = []
+        _run_threads(lambda i: indices.append(barrier.wait(5)), 2)
+        self.assertEqual(sorted(indices), [0, 1])
+
+    def test_swarm_sync(self):
+        swarm = _swarm(3)
+        self.addCleanup(swarm.end, 1)
+        events = []
+
+        def run(i, tello):
+            time.sleep(0.01 * i)
+            events.append('first')
+            swarm.sync(5)
+            events.append('second')
+
+        swarm.parallel(run)
+        self.assertEqual(events, ['first'] * 3 + ['second'] * 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,238 @@
+import gc
+import threading
+import time
+import unittest
+from unittest import mock
+
+from djitellopy import Tello, TelloCommandError
+
+
+class FakeDrone:
+    """Answers the commands a Tello sends through its send_command_fn. The answers of a
+    command are used in turn, the last one repeats. An answer of None is not sent, the
+    command times out. With a delay, or for an (answer, delay) tuple, the answer arrives
+    from another thread.
+    """
+
+    def __init__(self, tello, answers, delay=0):
+        self.tello = tello
+        self.answers = {command: list(answer) if isinstance(answer, list) else [answer] for command, answer in answers.items()}
+        self.delay = delay
+        self.sent = []
+        tello.set_send_command_fn(self.send)
+
+    def send(self, command, address):
+        self.sent.append(command)
+        answers = self.answers[command]
+        answer = answers.pop(0) if len(answers) > 1 else answers[0]
+        delay = self.delay
+        if isinstance(answer, tuple):
+            answer, delay = answer
+        if answer is None:
+            return
+        if delay:
+            threading.Timer(delay, self.tello.udp_control_receiver, (answer, address)).start()
+        else:
+            self.tello.udp_control_receiver(answer, address)
+
+
+class TelloTestCase(unittest.TestCase):
+
+    def setUp(self):
+        # no waiting between commands, and timeouts after 50ms instead of RESPONSE_TIMEOUT
+        patches = [
+            mock.patch.object(Tello, 'TIME_BTW_COMMANDS', 0),
+            mock.patch.object(Tello._send_command_raw, '__defaults__', (0.05,)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+
+class EndTest(unittest.TestCase):
+
+    def test_end_on_silent_drone_sends_each_command_once(self):
+        sent = []
+        tello = Tello('0')
+        tello.set_send_command_fn(lambda command, address: sent.append(command))
+        tello.is_flying = True
+        tello.stream_on = True
+
+        # the drone sent state packets, but none for longer than STATE_SILENCE_TIMEOUT
+        tello.udp_state_receiver(b'bat:80;\r\n', (Tello.TELLO_IP, Tello.STATE_UDP_PORT))
+        tello._state_timestamp -= Tello.STATE_SILENCE_TIMEOUT + 1
+
+        timestamp = time.monotonic()
+        tello.end()
+        # land is not retried, which would take retry_count * RESPONSE_TIMEOUT seconds
+        self.assertLess(time.monotonic() - timestamp, 1)
+        self.assertEqual(sent, [b'land', b'streamoff'])
+
+        tello.end()
+        del tello
+        gc.collect()
+        # neither the second end() nor the finalizer send them again
+        self.assertEqual(sent, [b'land', b'streamoff'])
+
+
+class StateParserTest(unittest.TestCase):
+
+    STATE = (b'mid:-1;x:0;y:0;z:0;mpry:0,0,0;pitch:1;roll:-2;yaw:3;vgx:0;vgy:0;vgz:0;'
+             b'templ:60;temph:62;tof:10;h:0;bat:87;baro:168.34;time:0;agx:-3.00;agy:1.00;agz:-999.00;\r\n')
+
+    def test_fields_are_converted(self):
+        state = Tello('0').parse_state(self.STATE)
+        self.assertEqual(len(state), 21)
+        self.assertEqual(state['pitch'], 1)
+        self.assertEqual(state['roll'], -2)
+        self.assertEqual(state['bat'], 87)
+        self.assertEqual(state['baro'], 168.34)
+        self.assertEqual(state['agz'], -999.0)
+        self.assertEqual(state['mpry'], '0,0,0')
+        self.assertIsInstance(state['templ'], int)
+        self.assertIsInstance(state['agx'], float)
+
+    def test_unknown_and_malformed_fields(self):
+        state = Tello('0').parse_state(b'bat:87;new:abc;h:x;\r\n')
+        # unknown fields are kept as strings, a malformed value only skips its field
+        self.assertEqual(state, {'bat': 87, 'new': 'abc'})
+
+    def test_not_a_state_packet(self):
+        tello = Tello('0')
+        self.assertEqual(tello.parse_state(b'ok'), {})
+        self.assertEqual(tello.parse_state_text('pitch:5;roll:6;yaw:7;'), {'pitch': 5, 'roll': 6, 'yaw': 7})
+
+    def test_receiver_publishes_the_snapshot(self):
+        tello = Tello('0')
+        tello.udp_state_receiver(self.STATE, ('192.168.10.2', Tello.STATE_UDP_PORT))
+        self.assertEqual(tello.get_current_state(), {})
+        tello.udp_state_receiver(self.STATE, (Tello.TELLO_IP, Tello.STATE_UDP_PORT))
+        self.assertEqual(tello.get_battery(), 87)
+        self.assertEqual(tello.get_yaw(), 3)
+        self.assertTrue(tello._state_received.is_set())
+
+
+class RecentStateTest(TelloTestCase):
+
+    def test_queries_answer_from_recent_state(self):
+        tello = Tello('0')
+        drone = FakeDrone(tello, {})
+        tello.udp_state_receiver(b'bat:87;templ:60;temph:63;tof:10;\r\n', (Tello.TELLO_IP, Tello.STATE_UDP_PORT))
+        self.assertEqual(tello.query_battery(max_age=1), 87)
+        temperature = tello.query_temperature(max_age=1)
+        self.assertEqual(temperature, 61)
+        self.assertIsInstance(temperature, int)
+        self.assertEqual(tello.query_distance_tof(max_age=1), 10)
+        self.assertEqual(drone.sent, [])
+
+    def test_old_state_is_not_used(self):
+        tello = Tello('0')
+        drone = FakeDrone(tello, {b'temp?': b'70'})
+        tello.udp_state_receiver(b'templ:60;temph:63;\r\n', (Tello.TELLO_IP, Tello.STATE_UDP_PORT))
+        tello._state_timestamp -= 2
+        self.assertEqual(tello.query_temperature(max_age=1), 70)
+        self.assertEqual(tello.query_temperature(), 70)
+        self.assertEqual(drone.sent, [b'temp?', b'temp?'])
+
+
+class QueryCacheTest(TelloTestCase):
+
+    def test_response_is_reused(self):
+        tello = Tello('0')
+        drone = FakeDrone(tello, {b'sdk?': b'30', b'tof?': b'801mm'})
+        self.assertEqual(tello.query_sdk_version(), '30')
+        self.assertEqual(tello.query_sdk_version(), '30')
+        self.assertEqual(tello.query_distance_tof(), 80.1)
+        self.assertEqual(tello.query_distance_tof(), 80.1)
+        self.assertEqual(drone.sent, [b'sdk?', b'tof?'])
+
+    def test_response_expires_after_ttl(self):
+        tello = Tello('0')
+        drone = FakeDrone(tello, {b'tof?': [b'801mm', b'500mm']})
+        self.assertEqual(tello.query_distance_tof(), 80.1)
+        tello._query_cache[b'tof?'] = (time.monotonic() - Tello.QUERY_CACHE_TTL, tello._query_cache[b'tof?'][1])
+        self.assertEqual(tello.query_distance_tof(), 50)
+        self.assertEqual(drone.sent, [b'tof?', b'tof?'])
+
+    def test_timeout_is_not_cached(self):
+        tello = Tello('0')
+        drone = FakeDrone(tello, {b'sdk?': [None, b'30'], b'wifi?': [None, b'90']})
+        self.assertTrue(tello.query_sdk_version().startswith('Aborting command'))
+        self.assertEqual(tello.query_sdk_version(), '30')
+        self.assertEqual(tello.query_sdk_version(), '30')
+        self.assertTrue(tello.query_wifi_signal_noise_ratio().startswith('Aborting command'))
+        self.assertEqual(tello.query_wifi_signal_noise_ratio(), '90')
+        self.assertEqual(drone.sent, [b'sdk?', b'sdk?', b'wifi?', b'wifi?'])
+
+
+
+class SharedQueryTest(TelloTestCase):
+
+    def query_concurrently(self, query, count=5):
+        results = []
+        barrier = threading.Barrier(count)
+
+        def run():
+            barrier.wait()
+            try:
+                results.append(query())
+            except Exception as e:
+                results.append(e)
+
+        threads = [threading.Thread(target=run) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_identical_queries_share_a_round_trip(self):
+        tello = Tello('0')
+        drone = FakeDrone(tello, {b'battery?': b'87'}, delay=0.03)
+        self.assertEqual(self.query_concurrently(tello.query_battery), [87] * 5)
+        self.assertEqual(drone.sent, [b'battery?'])
+        self.assertEqual(tello._inflight, {})
+
+    def test_error_is_shared(self):
+        tello = Tello('0')
+        drone = FakeDrone(tello, {b'speed?': b'error'}, delay=0.03)
+        results = self.query_concurrently(tello.query_speed)
+        self.assertEqual(len(results), 5)
+        for result in results:
+            self.assertIsInstance(result, TelloCommandError)
+        self.assertEqual(drone.sent, [b'speed?'])
+
+    def test_later_query_sends_again(self):
+        tello = Tello('0')
+        drone = FakeDrone(tello, {b'battery?': [b'87', b'86']})
+        self.assertEqual(tello.query_battery(), 87)
+        self.assertEqual(tello.query_battery(), 86)
+        self.assertEqual(drone.sent, [b'battery?', b'battery?'])
+
+
+class QueryManyTest(TelloTestCase):
+
+    def test_responses_by_command(self):
+        tello = Tello('0')
+        FakeDrone(tello, {b'battery?': b'87', b'tof?': b'801mm'})
+        self.assertEqual(tello.query_many([b'battery?', b'tof?']), {b'battery?': '87', b'tof?': '801mm'})
+
+    def test_error_takes_every_response(self):
+        tello = Tello('0')
+        FakeDrone(tello, {b'sdk?': b'error', b'tof?': b'801mm', b'speed?': b'50'})
+        with self.assertRaises(TelloCommandError):
+            tello.query_many([b'sdk?', b'tof?'])
+        # not the left-over response to tof?
+        self.assertEqual(tello.query_speed(), 50)
+
+    def test_late_responses_are_not_taken_by_the_fallback(self):
+        tello = Tello('0')
+        # the batch responses arrive after the query_many timeout, before those of the fallback
+        FakeDrone(tello, {b'sdk?': [(b'30', 0.1), (b'31', 0.2)], b'speed?': [(b'50', 0.1), (b'51', 0.2)]})
+        with mock.patch.object(Tello._send_command_raw, '__defaults__', (0.5,)):
+            results = tello.query_many([b'sdk?', b'speed?'], timeout=0.05)
+        self.assertEqual(results, {b'sdk?': '31', b'speed?': '51'})
+
+
+if __name__ == '__main__':
+    unittest.main()